@@ -1,6 +1,6 @@
-import requests
+import httpx
 import base64
-import json
+import orjson
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -19,10 +19,15 @@ credentials = base64.b64encode(f"{email}:{password}".encode()).decode()
 
 # API endpoint and data
 url = "https://hsp-prod.rockshore.net/api/v1/serviceMetrics"
-headers = {
-    "Authorization": f"Basic {credentials}",
-    "Content-Type": "application/json"
-}
+
+# Auth headers live on the client, built once and reused (with the connection) for every call
+client = httpx.Client(
+    headers={
+        "Authorization": f"Basic {credentials}",
+        "Content-Type": "application/json"
+    },
+    timeout=60
+)
 
 data = {
     "from_loc": "BTN",
@@ -36,21 +41,22 @@ data = {
 
 try:
     print("Attempting connection to HSP API...")
-    response = requests.post(url, headers=headers, json=data, timeout=60)
+    response = client.post(url, json=data)
     print(f"✅ Success! Status Code: {response.status_code}")
     if response.status_code == 200:
-        data = response.json()
+        # orjson parses the raw bytes directly, skipping the decode-to-str step
+        data = orjson.loads(response.content)
         print(f"Services found: {len(data.get('Services', []))}")
         print("\n" + "="*50)
         print("FULL JSON RESPONSE:")
         print("="*50)
-        print(json.dumps(data, indent=2))
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
     else:
         print(f"Response: {response.text}")
-except requests.exceptions.Timeout:
+except httpx.TimeoutException:
     print("❌ Timeout - HSP API server appears to be down or very slow")
     print("This commonly happens during overnight maintenance windows")
-except requests.exceptions.ConnectionError:
+except httpx.ConnectError:
     print("❌ Connection Error - Cannot reach HSP API server")
     print("Check your internet connection or the server may be down")
 except Exception as e:
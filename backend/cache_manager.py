@@ -1,14 +1,79 @@
 import sqlite3
-import json
+import orjson
 import uuid
-from datetime import datetime
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import cached_property
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 import logging
 import os
+import threading
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+def _compress_payload(payload_json: bytes) -> bytes:
+    """Compress a JSON payload for storage; HSP responses repeat the same keys and shrink several-fold"""
+    return zlib.compress(payload_json, 6)
+
+def _decompress_payload(stored: Any) -> str:
+    """Inverse of _compress_payload; rows written before compression are plain TEXT"""
+    if isinstance(stored, bytes):
+        return zlib.decompress(stored).decode()
+    return stored
+
+def _expires_at(ttl_seconds: Optional[int]) -> Optional[str]:
+    """UTC expiry in SQLite's CURRENT_TIMESTAMP format, or None for entries that never expire"""
+    if ttl_seconds is None:
+        return None
+    return (datetime.utcnow() + timedelta(seconds=ttl_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+@dataclass
+class CachedService:
+    """A cached service request/response row; the JSON payloads are only parsed when accessed"""
+    rid: str
+    service_name: str
+    timestamp: str
+    request_json: str
+    response_json: str
+    request_size: Optional[int]
+    response_size: Optional[int]
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "CachedService":
+        return cls(
+            rid=row["rid"],
+            service_name=row["service_name"],
+            timestamp=row["created_at"],
+            request_json=row["request_json"],
+            response_json=_decompress_payload(row["response_json"]),
+            request_size=row["request_size"],
+            response_size=row["response_size"],
+        )
+
+    @cached_property
+    def request(self) -> Any:
+        return orjson.loads(self.request_json)
+
+    @cached_property
+    def response(self) -> Any:
+        return orjson.loads(self.response_json)
+
+    def to_json(self) -> str:
+        """Serialize for the cache API, splicing in the stored payloads without re-parsing them"""
+        envelope = orjson.dumps({
+            "rid": self.rid,
+            "service_name": self.service_name,
+            "timestamp": self.timestamp,
+            "metadata": {
+                "request_size": self.request_size,
+                "response_size": self.response_size
+            }
+        }).decode()
+        return f'{envelope[:-1]}, "request": {self.request_json}, "response": {self.response_json}}}'
+
 class CacheManager:
     """Manages logging/caching of service requests and metrics using SQLite with 300 MB size limit"""
 
@@ -20,16 +85,47 @@ class CacheManager:
         # Create directories
         os.makedirs(self.base_path, exist_ok=True)
 
+        # One connection for the life of the process; opening per call costs a file open
+        # and pager init every time. Autocommit mode so transactions are explicit.
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+
         # Initialize SQLite database
         self._init_database()
         logger.info(f"Cache initialized with {max_cache_size_mb} MB size limit")
     
+    @contextmanager
+    def _transaction(self):
+        """Run the enclosed statements atomically on the shared connection"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                yield cursor
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
     def _init_database(self):
         """Initialize SQLite database with required tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
+            with self._lock:
+                # Incremental auto-vacuum lets eviction hand pages back without a full VACUUM.
+                # It only takes effect on a new (empty) database, so it must come first.
+                self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+
+                # Connection tuning: WAL lets readers run alongside the writer and, with
+                # synchronous=NORMAL, fsyncs at checkpoints rather than on every commit
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+                self._conn.execute("PRAGMA temp_store=MEMORY")
+                self._conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+                self._conn.execute("PRAGMA foreign_keys=ON")  # Needed for ON DELETE CASCADE
+
+            with self._transaction() as cursor:
                 # Metrics table - RID is primary key (no timestamp needed - historical data)
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS metrics (
@@ -46,8 +142,8 @@ class CacheManager:
                     )
                 """)
                 
-                # Service requests table - Full request/response data
-                cursor.execute("""
+                # Service requests table - Full request/response data; rows go with their metrics entry
+                service_requests_ddl = """
                     CREATE TABLE IF NOT EXISTS service_requests (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         rid TEXT NOT NULL,
@@ -56,18 +152,76 @@ class CacheManager:
                         response_json TEXT NOT NULL,
                         request_size INTEGER,
                         response_size INTEGER,
+                        from_loc TEXT COLLATE NOCASE,
+                        to_loc TEXT COLLATE NOCASE,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        expires_at DATETIME,
+                        FOREIGN KEY (rid) REFERENCES metrics (rid) ON DELETE CASCADE
+                    )
+                """
+                cursor.execute(service_requests_ddl)
+
+                # Databases created before the route columns existed: add and backfill them
+                columns = {row["name"] for row in cursor.execute("PRAGMA table_info(service_requests)")}
+                if "from_loc" not in columns:
+                    cursor.execute("ALTER TABLE service_requests ADD COLUMN from_loc TEXT COLLATE NOCASE")
+                    cursor.execute("ALTER TABLE service_requests ADD COLUMN to_loc TEXT COLLATE NOCASE")
+                    cursor.execute("""
+                        UPDATE service_requests
+                        SET from_loc = json_extract(request_json, '$.from_loc'),
+                            to_loc = json_extract(request_json, '$.to_loc')
+                        WHERE json_valid(request_json)
+                    """)
+
+                # Databases created before per-entry TTLs: existing rows never expire
+                if "expires_at" not in columns:
+                    cursor.execute("ALTER TABLE service_requests ADD COLUMN expires_at DATETIME")
+
+                # Databases created before the cascade existed: rebuild the table with it, dropping
+                # rows whose metrics entry is already gone (the cascade would have removed them)
+                foreign_keys = cursor.execute("PRAGMA foreign_key_list(service_requests)").fetchall()
+                if any(fk["on_delete"] != "CASCADE" for fk in foreign_keys):
+                    cursor.execute("ALTER TABLE service_requests RENAME TO service_requests_old")
+                    cursor.execute(service_requests_ddl)
+                    cursor.execute("""
+                        INSERT INTO service_requests
+                        (id, rid, service_name, request_json, response_json, request_size, response_size,
+                         from_loc, to_loc, created_at, expires_at)
+                        SELECT id, rid, service_name, request_json, response_json, request_size, response_size,
+                               from_loc, to_loc, created_at, expires_at
+                        FROM service_requests_old
+                        WHERE rid IN (SELECT rid FROM metrics)
+                    """)
+                    cursor.execute("DROP TABLE service_requests_old")
+
+                # Station delays derived from an HSP RID for one origin/destination pair, so a
+                # repeat analysis skips decompressing and parsing the full details payload
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS station_delays (
+                        rid TEXT NOT NULL,
+                        from_loc TEXT NOT NULL COLLATE NOCASE,
+                        to_loc TEXT NOT NULL COLLATE NOCASE,
+                        departure_delay INTEGER,
+                        arrival_delay INTEGER,
+                        departure_cancel_reason TEXT,
+                        arrival_cancel_reason TEXT,
                         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (rid) REFERENCES metrics (rid)
+                        PRIMARY KEY (rid, from_loc, to_loc)
                     )
                 """)
-                
+
                 # Create indexes for better performance
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_route ON metrics(route)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_endpoint ON metrics(endpoint)")
+                # Eviction walks this oldest-first and stops at its LIMIT instead of sorting the table
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_created_at ON metrics(created_at, rid)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_rid ON service_requests(rid)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_service_name ON service_requests(service_name)")
-                
-                conn.commit()
+                # (service_name, created_at) serves the read-through "latest row for this name" lookup
+                # straight from the index; it supersedes the old single-column index
+                cursor.execute("DROP INDEX IF EXISTS idx_service_requests_service_name")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_service_name_created ON service_requests(service_name, created_at)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_service_requests_route ON service_requests(from_loc, to_loc)")
+
                 logger.info("SQLite database initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database: {e}")
@@ -77,8 +231,12 @@ class CacheManager:
         return f"RID_{uuid.uuid4().hex[:8]}"
 
     def _get_cache_size(self) -> int:
-        """Get current cache size in bytes"""
-        return self.db_path.stat().st_size if self.db_path.exists() else 0
+        """Get bytes used by live pages; freed pages are reused by later inserts so don't count"""
+        with self._lock:
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - freelist_count) * page_size
 
     def _enforce_cache_limit(self):
         """Remove oldest entries if cache exceeds size limit"""
@@ -89,55 +247,49 @@ class CacheManager:
 
             logger.info(f"Cache size ({current_size / (1024*1024):.2f} MB) exceeds limit ({self.max_cache_size_bytes / (1024*1024):.2f} MB). Cleaning up...")
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                # Delete oldest 20% of entries to make room
-                # Delete from service_requests first (due to foreign key)
+            with self._transaction() as cursor:
+                # Delete oldest 20% of entries to make room; their service_requests rows
+                # follow via ON DELETE CASCADE, so the victim scan runs once
+                metrics_count = cursor.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
                 cursor.execute("""
-                    DELETE FROM service_requests
-                    WHERE rid IN (
+                    WITH victims AS (
                         SELECT rid FROM metrics
                         ORDER BY created_at ASC
-                        LIMIT (SELECT COUNT(*) * 0.2 FROM metrics)
+                        LIMIT ?
                     )
-                """)
-
-                # Then delete from metrics
+                    DELETE FROM metrics WHERE rid IN (SELECT rid FROM victims)
+                """, (max(1, metrics_count // 5),))
+                # Derived station delays go with the cache window they were computed in
                 cursor.execute("""
-                    DELETE FROM metrics
-                    WHERE rid IN (
-                        SELECT rid FROM metrics
-                        ORDER BY created_at ASC
-                        LIMIT (SELECT COUNT(*) * 0.2 FROM metrics)
-                    )
+                    DELETE FROM station_delays
+                    WHERE created_at < (SELECT MIN(created_at) FROM metrics)
                 """)
 
-                conn.commit()
+            with self._lock:
+                # Return a bounded number of free pages to the OS instead of a full VACUUM,
+                # which rewrites the whole file under an exclusive lock. The pragma frees
+                # one page per step, so the result must be drained.
+                self._conn.execute("PRAGMA incremental_vacuum(1000)").fetchall()
 
-                # Vacuum to reclaim space
-                cursor.execute("VACUUM")
-
-                new_size = self._get_cache_size()
-                logger.info(f"Cache cleaned. New size: {new_size / (1024*1024):.2f} MB")
+            new_size = self._get_cache_size()
+            logger.info(f"Cache cleaned. New size: {new_size / (1024*1024):.2f} MB")
         except Exception as e:
             logger.error(f"Failed to enforce cache limit: {e}")
 
     def cache_metrics(self, rid: str, metrics_data: Dict[str, Any]) -> str:
         """Cache metrics data keyed by RID"""
+        self.cache_metrics_bulk([(rid, metrics_data)])
+        return rid
+
+    def cache_metrics_bulk(self, entries: List[tuple]) -> int:
+        """Cache many (rid, metrics_data) pairs in a single transaction; returns rows written"""
+        if not entries:
+            return 0
         try:
             self._enforce_cache_limit()
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                # Insert or replace metrics (RID is historical, so no timestamp updates needed)
-                cursor.execute("""
-                    INSERT OR REPLACE INTO metrics
-                    (rid, duration_ms, endpoint, status_code, request_size, response_size,
-                     route, services_count, error)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+            rows = [
+                (
                     rid,
                     metrics_data.get("duration_ms"),
                     metrics_data.get("endpoint"),
@@ -147,56 +299,78 @@ class CacheManager:
                     metrics_data.get("route"),
                     metrics_data.get("services_count"),
                     metrics_data.get("error")
-                ))
+                )
+                for rid, metrics_data in entries
+            ]
+
+            with self._transaction() as cursor:
+                # Insert or update metrics (RID is historical, so no timestamp updates needed).
+                # An upsert rather than INSERT OR REPLACE: REPLACE deletes the old row, which
+                # would cascade to the RID's service requests.
+                cursor.executemany("""
+                    INSERT INTO metrics
+                    (rid, duration_ms, endpoint, status_code, request_size, response_size,
+                     route, services_count, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (rid) DO UPDATE SET
+                        duration_ms = excluded.duration_ms,
+                        endpoint = excluded.endpoint,
+                        status_code = excluded.status_code,
+                        request_size = excluded.request_size,
+                        response_size = excluded.response_size,
+                        route = excluded.route,
+                        services_count = excluded.services_count,
+                        error = excluded.error
+                """, rows)
 
-                conn.commit()
-                logger.info(f"Cached metrics for RID: {rid}")
-                return rid
+            logger.debug(f"Cached metrics for {len(rows)} RID(s)")
+            return len(rows)
         except Exception as e:
-            logger.error(f"Failed to cache metrics for RID {rid}: {e}")
-            return rid
-    
+            logger.error(f"Failed to cache metrics for {len(entries)} RID(s): {e}")
+            return 0
+
     def cache_service_request(self, service_name: str, request_data: Dict[str, Any],
-                            response_data: Dict[str, Any], rid: str) -> str:
-        """Cache detailed service request/response data"""
+                            response_data: Dict[str, Any], rid: str, ttl_seconds: Optional[int] = None) -> str:
+        """Cache detailed service request/response data; ttl_seconds=None keeps it until evicted"""
         try:
             self._enforce_cache_limit()
-            request_json = json.dumps(request_data)
-            response_json = json.dumps(response_data)
+            request_json = orjson.dumps(request_data).decode()
+            response_json = orjson.dumps(response_data)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
+            with self._transaction() as cursor:
                 cursor.execute("""
                     INSERT INTO service_requests 
-                    (rid, service_name, request_json, response_json, request_size, response_size)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    (rid, service_name, request_json, response_json, request_size, response_size,
+                     from_loc, to_loc, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     rid,
                     service_name,
                     request_json,
-                    response_json,
+                    _compress_payload(response_json),
                     len(request_json),
-                    len(response_json)
+                    len(response_json),
+                    request_data.get("from_loc"),
+                    request_data.get("to_loc"),
+                    _expires_at(ttl_seconds)
                 ))
-                
-                conn.commit()
-                logger.info(f"Cached service request: {service_name} (RID: {rid})")
-                return str(cursor.lastrowid)
+
+            logger.debug(f"Cached service request: {service_name} (RID: {rid})")
+            return str(cursor.lastrowid)
         except Exception as e:
             logger.error(f"Failed to cache service request {service_name}: {e}")
             return ""
 
-    def get_cached_service_by_name(self, service_name: str) -> Optional[Dict[str, Any]]:
-        """Retrieve most recent cached service request/response by service_name"""
+    def get_cached_service_by_name(self, service_name: str) -> Optional[CachedService]:
+        """Retrieve most recent unexpired cached service request/response by service_name"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 cursor.execute(
                     """
                     SELECT * FROM service_requests
                     WHERE service_name = ?
+                      AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
                     ORDER BY created_at DESC
                     LIMIT 1
                     """,
@@ -205,27 +379,52 @@ class CacheManager:
                 row = cursor.fetchone()
                 if not row:
                     return None
-                return {
-                    "rid": row["rid"],
-                    "service_name": row["service_name"],
-                    "timestamp": row["created_at"],
-                    "request": json.loads(row["request_json"]),
-                    "response": json.loads(row["response_json"]),
-                    "metadata": {
-                        "request_size": row["request_size"],
-                        "response_size": row["response_size"],
-                    },
-                }
+                return CachedService.from_row(row)
         except Exception as e:
             logger.error(f"Failed to get cached service by name {service_name}: {e}")
             return None
     
+    def cache_station_delays_bulk(self, from_loc: str, to_loc: str, entries: List[tuple]) -> int:
+        """Cache many (rid, departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason) tuples for one route; returns rows written"""
+        if not entries:
+            return 0
+        try:
+            with self._transaction() as cursor:
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO station_delays
+                    (rid, from_loc, to_loc, departure_delay, arrival_delay,
+                     departure_cancel_reason, arrival_cancel_reason)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(rid, from_loc, to_loc, *delays) for rid, *delays in entries])
+
+            logger.debug(f"Cached station delays for {len(entries)} RID(s) on {from_loc}->{to_loc}")
+            return len(entries)
+        except Exception as e:
+            logger.error(f"Failed to cache station delays for {len(entries)} RID(s): {e}")
+            return 0
+
+    def get_station_delays_bulk(self, rids: List[str], from_loc: str, to_loc: str) -> Dict[str, tuple]:
+        """Map each cached RID to (departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason) for one route"""
+        try:
+            with self._lock:
+                cursor = self._conn.cursor()
+                # The RID list goes in as one JSON parameter rather than one placeholder per RID
+                cursor.execute("""
+                    SELECT rid, departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason
+                    FROM station_delays
+                    WHERE from_loc = ? AND to_loc = ?
+                      AND rid IN (SELECT value FROM json_each(?))
+                """, (from_loc, to_loc, orjson.dumps(rids).decode()))
+                return {row["rid"]: tuple(row)[1:] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Failed to get station delays for {from_loc}->{to_loc}: {e}")
+            return {}
+
     def get_metrics_by_rid(self, rid: str) -> Optional[Dict[str, Any]]:
         """Retrieve metrics data by RID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 
                 cursor.execute("SELECT * FROM metrics WHERE rid = ?", (rid,))
                 row = cursor.fetchone()
@@ -240,9 +439,8 @@ class CacheManager:
     def get_all_metrics(self) -> Dict[str, Any]:
         """Get all cached metrics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 
                 cursor.execute("SELECT * FROM metrics ORDER BY created_at DESC")
                 rows = cursor.fetchall()
@@ -255,8 +453,8 @@ class CacheManager:
     def list_service_files(self) -> List[str]:
         """List all cached service files (returns service names for compatibility)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 
                 cursor.execute("""
                     SELECT DISTINCT service_name, COUNT(*) as count 
@@ -271,74 +469,27 @@ class CacheManager:
             logger.error(f"Failed to list service files: {e}")
             return []
     
-    def get_service_by_filename(self, filename: str) -> Optional[Dict[str, Any]]:
+    def get_service_by_filename(self, filename: str) -> Optional[CachedService]:
         """Get cached service data by service name (adapted from filename)"""
-        try:
-            # Extract service name from filename format
-            service_name = filename.split('(')[0].strip() if '(' in filename else filename
-            
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    SELECT * FROM service_requests 
-                    WHERE service_name = ? 
-                    ORDER BY created_at DESC 
-                    LIMIT 1
-                """, (service_name,))
-                row = cursor.fetchone()
-                
-                if row:
-                    return {
-                        "rid": row['rid'],
-                        "service_name": row['service_name'],
-                        "timestamp": row['created_at'],
-                        "request": json.loads(row['request_json']),
-                        "response": json.loads(row['response_json']),
-                        "metadata": {
-                            "request_size": row['request_size'],
-                            "response_size": row['response_size']
-                        }
-                    }
-                return None
-        except Exception as e:
-            logger.error(f"Failed to get service file {filename}: {e}")
-            return None
+        # Extract service name from filename format
+        service_name = filename.split('(')[0].strip() if '(' in filename else filename
+        return self.get_cached_service_by_name(service_name)
     
-    def search_services_by_route(self, from_loc: str, to_loc: str) -> List[Dict[str, Any]]:
+    def search_services_by_route(self, from_loc: str, to_loc: str) -> List[CachedService]:
         """Search cached services by route"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 
-                # Search in service requests where request JSON contains the route
+                # Indexed lookup on the route columns populated at insert time
                 cursor.execute("""
                     SELECT * FROM service_requests 
-                    WHERE request_json LIKE ? AND request_json LIKE ?
+                    WHERE from_loc = ? AND to_loc = ?
                     ORDER BY created_at DESC
-                """, (f'%"from_loc": "{from_loc}"%', f'%"to_loc": "{to_loc}"%'))
+                """, (from_loc, to_loc))
                 rows = cursor.fetchall()
                 
-                results = []
-                for row in rows:
-                    try:
-                        results.append({
-                            "rid": row['rid'],
-                            "service_name": row['service_name'],
-                            "timestamp": row['created_at'],
-                            "request": json.loads(row['request_json']),
-                            "response": json.loads(row['response_json']),
-                            "metadata": {
-                                "request_size": row['request_size'],
-                                "response_size": row['response_size']
-                            }
-                        })
-                    except json.JSONDecodeError:
-                        continue
-                
-                return results
+                return [CachedService.from_row(row) for row in rows]
         except Exception as e:
             logger.error(f"Failed to search services by route {from_loc}->{to_loc}: {e}")
             return []
@@ -346,8 +497,8 @@ class CacheManager:
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 
                 # Get metrics count
                 cursor.execute("SELECT COUNT(*) FROM metrics")
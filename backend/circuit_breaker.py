@@ -0,0 +1,72 @@
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# HSP throttling us; the caller backs off on it, and it says nothing about upstream health
+RATE_LIMITED_STATUS_CODE = 429
+
+class CircuitBreaker:
+    """Stops calling a degraded upstream after repeated failures, probing again after a cool-off window"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, fail_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now"""
+        if self.state == self.CLOSED:
+            return True
+
+        # A probe that never reported back (cancelled, or raised something unclassified) is
+        # given up on after reset_timeout, so the breaker can't stay half-open forever
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Let exactly one probe through; its result decides whether we close again
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            logger.info(f"{self.name} circuit half-open, sending probe request")
+            return True
+
+        return False
+
+    def record_success(self):
+        """Reset the breaker after a healthy response"""
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name} circuit closed, upstream recovered")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        """Count a failure and trip the breaker once the threshold is reached"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.fail_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"{self.name} circuit open after {self.failures} failures; pausing requests for {self.reset_timeout:.0f}s")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def record_response(self, status_code: int):
+        """Classify an HTTP status: 5xx and 408 count against the upstream, anything else is healthy.
+
+        429 leaves the failure count alone, though a throttled probe still proves HSP is up.
+        """
+        if status_code == RATE_LIMITED_STATUS_CODE:
+            if self.state == self.HALF_OPEN:
+                self.record_success()
+        elif status_code >= 500 or status_code == 408:
+            self.record_failure()
+        else:
+            self.record_success()
+
+# Shared breaker for the HSP API host
+hsp_breaker = CircuitBreaker("HSP")
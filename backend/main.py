@@ -1,56 +1,162 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from pydantic_settings import BaseSettings
 import uvicorn
 import httpx
 import base64
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Mapping, Callable
+from types import MappingProxyType
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import logging
+import logging.handlers
+import queue
+import atexit
 import os
 import openai
-import json
+import orjson
+import hashlib
 import time
 import asyncio
+import random
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, islice
+import numpy as np
 from cache_manager import cache_manager
+from circuit_breaker import hsp_breaker
 
 # Check if we're in production
 IS_PRODUCTION = os.getenv('NODE_ENV') == 'production' or os.getenv('NETLIFY') == 'true'
 
 # Load station code mappings
-def load_station_codes() -> Dict[str, str]:
-    """Load station code to name mapping"""
+def load_station_codes() -> Mapping[str, str]:
+    """Load station code to name mapping as a read-only view"""
     try:
-        with open("station_codes.json", "r") as f:
-            return json.load(f)
+        with open("station_codes.json", "rb") as f:
+            return MappingProxyType(orjson.loads(f.read()))
     except Exception as e:
         logger.warning(f"Could not load station codes: {e}")
-        return {}
+        return MappingProxyType({})
 
-def load_all_station_codes() -> Dict[str, str]:
-    """Load all station code to name mapping from comprehensive list"""
+def load_all_station_codes() -> Mapping[str, str]:
+    """Load all station code to name mapping from comprehensive list as a read-only view"""
     try:
-        with open("all_station_codes.json", "r") as f:
-            return json.load(f)
+        with open("all_station_codes.json", "rb") as f:
+            return MappingProxyType(orjson.loads(f.read()))
     except Exception as e:
         logger.warning(f"Could not load all station codes: {e}")
-        return {}
+        return MappingProxyType({})
 
 STATION_CODES = load_station_codes()
 ALL_STATION_CODES = load_all_station_codes()
 
+# Single frozen code -> name lookup, built once: the comprehensive list wins over the short
+# list, which only matters if the comprehensive file failed to load
+STATION_NAMES: Mapping[str, str] = MappingProxyType({**STATION_CODES, **ALL_STATION_CODES})
+
+@lru_cache(maxsize=4096)
 def get_station_name(code: str) -> str:
     """Get full station name from code, fallback to code if not found"""
-    return ALL_STATION_CODES.get(code.upper(), STATION_CODES.get(code, code))
+    return STATION_NAMES.get(code.upper(), code)
+
+# Autocomplete indexes over ALL_STATION_CODES, built once at import. Each station is referred to
+# by its position in the source map, so results tie-break exactly as a straight scan would.
+STATION_ENTRIES = tuple((code, name, name.upper()) for code, name in ALL_STATION_CODES.items())
+# Sorted (key, position) pairs: every key sharing a prefix sits in one contiguous run
+STATIONS_BY_CODE = sorted((code, position) for position, (code, _, _) in enumerate(STATION_ENTRIES))
+STATIONS_BY_NAME = sorted((name_upper, position) for position, (_, _, name_upper) in enumerate(STATION_ENTRIES))
+# Positions in autocomplete rank order for equally-placed matches: by name, and for equal names
+# by descending position, so walking it backwards gives name descending with ties in source order
+STATIONS_IN_NAME_ORDER = sorted(range(len(STATION_ENTRIES)), key=lambda position: (STATION_ENTRIES[position][1], -position))
+# All upper-cased names, in that order, in one newline-separated string, so a substring search
+# is a run of str.rfind calls; station names never contain a newline, so a match can't span two
+STATION_NAME_TEXT = "\n".join(STATION_ENTRIES[position][2] for position in STATIONS_IN_NAME_ORDER)
+STATION_NAME_OFFSETS = list(accumulate((len(STATION_ENTRIES[position][2]) + 1 for position in STATIONS_IN_NAME_ORDER[:-1]), initial=0))
+
+# Autocomplete answers change only when the station list does, so its hash serves as their ETag
+STATION_INDEX_ETAG = '"' + hashlib.sha256(orjson.dumps(dict(ALL_STATION_CODES))).hexdigest()[:32] + '"'
+AUTOCOMPLETE_CACHE_CONTROL = "public, max-age=86400"
+
+def stations_with_prefix(index: List[tuple[str, int]], prefix: str) -> Iterator[int]:
+    """Positions of stations whose key in a sorted (key, position) index starts with prefix"""
+    for i in range(bisect_left(index, (prefix,)), len(index)):
+        key, position = index[i]
+        if not key.startswith(prefix):
+            return
+        yield position
+
+def stations_containing(fragment: str) -> Iterator[int]:
+    """Positions of stations whose upper-cased name contains fragment, by name descending"""
+    if "\n" in fragment:
+        return
+    end = len(STATION_NAME_TEXT)
+    while True:
+        start = STATION_NAME_TEXT.rfind(fragment, 0, end)
+        if start == -1:
+            return
+        i = bisect_right(STATION_NAME_OFFSETS, start) - 1
+        yield STATIONS_IN_NAME_ORDER[i]
+        # One hit per station: carry on from the end of the previous name
+        end = STATION_NAME_OFFSETS[i]
+
+def rank_station_matches(query_upper: str, include_partial: bool) -> Iterator[tuple[int, str]]:
+    """
+    (position, match_type) for every station matching the query, best first.
+
+    Each station matches once, by code prefix, else name prefix, else (if include_partial)
+    name containing the query. Ranking follows the autocomplete endpoint's existing order:
+    partial matches, then name prefix matches, then code matches (an exact code first), each
+    by name descending. Matches are produced lazily, so a caller that only needs the first few
+    stops the search there.
+    """
+    def is_code_match(position: int) -> bool:
+        return STATION_ENTRIES[position][0].startswith(query_upper)
+
+    def is_name_match(position: int) -> bool:
+        return STATION_ENTRIES[position][2].startswith(query_upper)
+
+    if include_partial:
+        for position in stations_containing(query_upper):
+            if not is_code_match(position) and not is_name_match(position):
+                yield position, "partial"
+
+    # Candidates are sorted into source order first so the stable descending sort keeps ties
+    # in that order
+    name_matches = sorted(
+        position for position in stations_with_prefix(STATIONS_BY_NAME, query_upper)
+        if not is_code_match(position)
+    )
+    name_matches.sort(key=lambda position: STATION_ENTRIES[position][1], reverse=True)
+    for position in name_matches:
+        yield position, "name"
+
+    code_matches = sorted(stations_with_prefix(STATIONS_BY_CODE, query_upper))
+    code_matches.sort(
+        key=lambda position: (STATION_ENTRIES[position][0] == query_upper, STATION_ENTRIES[position][1]),
+        reverse=True
+    )
+    for position in code_matches:
+        yield position, "code"
+
+# Records are queued and written to the console by a background thread, so
+# per-request logging never blocks the event loop on a stdout write
+console_handler = logging.StreamHandler()  # Console output
+console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, console_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Console output
-    ]
+    handlers=[queue_handler]
 )
 logger = logging.getLogger(__name__)
 
@@ -62,6 +168,9 @@ class Settings(BaseSettings):
     RAIL_PWORD: str
     OPENAI_API_KEY: str
     CORS_ORIGINS: str = "http://localhost:3000, https://trelay.netlify.app"
+    # HTTP/2 to HSP is negotiated per connection and falls back to HTTP/1.1 on its own;
+    # set HSP_HTTP2=false to force HTTP/1.1 outright
+    HSP_HTTP2: bool = True
 
     class Config:
         env_file = ".env"
@@ -74,7 +183,62 @@ ALLOWED_ORIGINS = [origin.strip() for origin in settings.CORS_ORIGINS.split(",")
 DETAILS = "https://hsp-prod.rockshore.net/api/v1/serviceDetails"
 METRICS = "https://hsp-prod.rockshore.net/api/v1/serviceMetrics"
 
-app = FastAPI(title="Hackathon API", version="1.0.0")
+# HSP responses worth retrying; auth failures (401/403) and 4xx lookups are final
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Concurrent serviceDetails requests per batch; HSP starts answering 503 above this
+HSP_MAX_CONCURRENT = 3
+
+# Longest wait honoured from an HSP Retry-After header; a worker holds its slot while it sleeps
+MAX_RETRY_AFTER_SECONDS = 5.0
+
+# Cache lifetimes: HSP data for services that ran over a week ago is final, while recent
+# days can still be amended, so those entries are refetched after an hour
+HISTORICAL_CACHE_TTL = 30 * 24 * 60 * 60
+RECENT_CACHE_TTL = 60 * 60
+HISTORICAL_AFTER = timedelta(days=7)
+
+def hsp_cache_ttl(service_date: str, date_format: str) -> int:
+    """Pick the cache TTL in seconds for HSP data about services running on service_date"""
+    try:
+        ran_on = datetime.strptime(service_date, date_format)
+    except ValueError:
+        return RECENT_CACHE_TTL
+    return HISTORICAL_CACHE_TTL if datetime.now() - ran_on > HISTORICAL_AFTER else RECENT_CACHE_TTL
+
+# How long a complete fixed-route histogram is served from memory before being rebuilt
+HISTOGRAM_RESULT_TTL = 24 * 60 * 60
+DEMO_RID_FILE = os.path.join(os.path.dirname(__file__), "pad_oxf_rids.txt")
+
+def load_demo_rids() -> Optional[tuple[str, ...]]:
+    """Load the fixed-route histogram's RIDs, or None when the file isn't there"""
+    try:
+        with open(DEMO_RID_FILE, "r") as f:
+            return tuple(line.strip() for line in f if line.strip())
+    except FileNotFoundError:
+        logger.warning(f"RID file not found: {DEMO_RID_FILE}")
+        return None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The demo RID list is static, so it is read once rather than on every histogram request
+    app.state.demo_rids = load_demo_rids()
+    app.state.demo_histogram = None
+
+    # One pooled HSP client for the process; keep-alive connections are reused across requests,
+    # and over HTTP/2 concurrent RID lookups multiplex onto a single connection
+    app.state.http = httpx.AsyncClient(
+        http2=settings.HSP_HTTP2,
+        timeout=180.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+    # Async so waiting on a completion never blocks the event loop
+    app.state.openai = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    yield
+    await app.state.openai.close()
+    await app.state.http.aclose()
+
+app = FastAPI(title="Hackathon API", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -84,6 +248,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-sent event endpoints; everything else is a single JSON body
+STREAMING_PATHS = {"/api/v1/journey-analysis-stream", "/api/v1/ai-analysis-stream"}
+
+class NonStreamingGZipMiddleware(GZipMiddleware):
+    """GZip regular responses, but pass event streams through: the compressor would otherwise
+    hold each event back until enough bytes pile up to emit a block"""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] in STREAMING_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(NonStreamingGZipMiddleware, minimum_size=256)
+
 class ServiceMetricsRequest(BaseModel):
     from_loc: str
     to_loc: str
@@ -99,15 +278,48 @@ class HSPCredentials(BaseModel):
     email: str
     password: str
 
-async def get_service_metrics(request: ServiceMetricsRequest, credentials: HSPCredentials, cache_request: bool = True):
-    start_time = time.time()
+class HSPServiceAttributesMetrics(BaseModel):
+    """The parts of a serviceMetrics service pattern the journey analysis reads"""
+    model_config = ConfigDict(extra="ignore")
+
+    rids: List[str] = []
+    gbtt_ptd: str = "unknown"
+    gbtt_pta: str = "unknown"
+
+class HSPServicePattern(BaseModel):
+    model_config = ConfigDict(extra="ignore")
 
-    auth_string = base64.b64encode(f"{credentials.email}:{credentials.password}".encode()).decode()
+    serviceAttributesMetrics: Optional[HSPServiceAttributesMetrics] = None
 
-    headers = {
-        "Authorization": f"Basic {auth_string}",
+# Validates a whole Services list in one pass, dropping every field not declared above
+hsp_service_patterns = TypeAdapter(List[HSPServicePattern])
+
+@lru_cache(maxsize=8)
+def hsp_auth_header(email: str, password: str) -> str:
+    """Basic auth header value for HSP, encoded once per credential pair"""
+    return "Basic " + base64.b64encode(f"{email}:{password}".encode()).decode()
+
+@lru_cache(maxsize=8)
+def hsp_headers(email: str, password: str) -> Mapping[str, str]:
+    """Read-only HSP request headers, built once per credential pair and shared by every call"""
+    return MappingProxyType({
+        "Authorization": hsp_auth_header(email, password),
         "Content-Type": "application/json"
-    }
+    })
+
+async def get_service_metrics(request: ServiceMetricsRequest, credentials: HSPCredentials, client: httpx.AsyncClient, cache_request: bool = True):
+    start_time = time.time()
+
+    # Try read-through cache first, before building anything only the API call needs
+    cached_service_name = f"metrics_{request.from_loc}_{request.to_loc}_{request.from_date}_{request.to_date}"
+    cached = cache_manager.get_cached_service_by_name(cached_service_name)
+    if cached and isinstance(cached.response, dict):
+        logger.info(f"✅ Cache hit for %s; returning cached metrics", cached_service_name)
+        return cached.response
+    else:
+        logger.info(f"❌ Cache miss for %s; fetching from API", cached_service_name)
+
+    headers = hsp_headers(credentials.email, credentials.password)
 
     payload = {
         "from_loc": request.from_loc,
@@ -124,69 +336,47 @@ async def get_service_metrics(request: ServiceMetricsRequest, credentials: HSPCr
     if request.tolerance:
         payload["tolerance"] = request.tolerance
 
-    # Try read-through cache first
-    cached_service_name = f"metrics_{request.from_loc}_{request.to_loc}_{request.from_date}_{request.to_date}"
-    cached = cache_manager.get_cached_service_by_name(cached_service_name)
-    if cached and isinstance(cached.get("response"), dict):
-        logger.info(f"✅ Cache hit for %s; returning cached metrics", cached_service_name)
-        return cached["response"]
-    else:
-        logger.info(f"❌ Cache miss for %s; fetching from API", cached_service_name)
+    # Serialized once: the same bytes are sent and measured for the cache metrics
+    payload_bytes = orjson.dumps(payload)
 
-    async with httpx.AsyncClient(timeout=180.0) as client:
-        try:
-            response = await client.post(METRICS, headers=headers, json=payload)
-            response.raise_for_status()
-            response_data = response.json()
-
-            # Cache the request and response if enabled
-            if cache_request:
-                duration_ms = int((time.time() - start_time) * 1000)
-                rid = cache_manager.generate_rid()
-
-                # Cache metrics
-                services_count = len(response_data.get("Services", [])) if isinstance(response_data, dict) else 0
-                metrics_data = {
-                    "duration_ms": duration_ms,
-                    "endpoint": "serviceMetrics",
-                    "status_code": response.status_code,
-                    "request_size": len(json.dumps(payload)),
-                    "response_size": len(json.dumps(response_data)),
-                    "route": f"{request.from_loc}->{request.to_loc}",
-                    "services_count": services_count
-                }
-                cache_manager.cache_metrics(rid, metrics_data)
+    # Set once HSP answers, so the error handler knows whether there is a response to report
+    response: Optional[httpx.Response] = None
+    try:
+        response = await client.post(METRICS, headers=headers, content=payload_bytes)
+        response.raise_for_status()
+        response_data = orjson.loads(response.content)
+
+        # Cache the request and response if enabled
+        if cache_request:
+            duration_ms = int((time.time() - start_time) * 1000)
+            rid = cache_manager.generate_rid()
+
+            # Cache metrics
+            services_count = len(response_data.get("Services", [])) if isinstance(response_data, dict) else 0
+            metrics_data = {
+                "duration_ms": duration_ms,
+                "endpoint": "serviceMetrics",
+                "status_code": response.status_code,
+                "request_size": len(payload_bytes),
+                "response_size": len(response.content),
+                "route": f"{request.from_loc}->{request.to_loc}",
+                "services_count": services_count
+            }
+            cache_manager.cache_metrics(rid, metrics_data)
 
-                # Cache detailed service request
-                service_name = f"metrics_{request.from_loc}_{request.to_loc}_{request.from_date}_{request.to_date}"
-                cache_manager.cache_service_request(service_name, payload, response_data, rid)
+            # Cache detailed service request under the name the read-through lookup uses
+            cache_manager.cache_service_request(
+                cached_service_name, payload, response_data, rid,
+                ttl_seconds=hsp_cache_ttl(request.to_date, "%Y-%m-%d")
+            )
 
-                logger.info(f"Cached service metrics request with RID: {rid}")
+            logger.info(f"Cached service metrics request with RID: {rid}")
 
-            return response_data
-        except httpx.HTTPError as e:
-            logger.error(f"HTTPError: {e}")
-            if 'response' in locals():
-                logger.error(f"Status: {response.status_code}, Response: {response.text}")
-                # Cache error metrics
-                if cache_request:
-                    duration_ms = int((time.time() - start_time) * 1000)
-                    rid = cache_manager.generate_rid()
-                    metrics_data = {
-                        "duration_ms": duration_ms,
-                        "endpoint": "serviceMetrics",
-                        "status_code": response.status_code,
-                        "request_size": len(json.dumps(payload)),
-                        "response_size": len(response.text),
-                        "route": f"{request.from_loc}->{request.to_loc}",
-                        "error": f"HTTP {response.status_code}: {response.text[:100]}"
-                    }
-                    cache_manager.cache_metrics(rid, metrics_data)
-                raise HTTPException(status_code=500, detail=f"HSP API error: Status {response.status_code} - {response.text}")
-            else:
-                raise HTTPException(status_code=500, detail=f"HSP API error: {str(e)}")
-        except Exception as e:
-            logger.error(f"Exception: {e}")
+        return response_data
+    except httpx.HTTPError as e:
+        logger.error(f"HTTPError: {e}")
+        if response is not None:
+            logger.error(f"Status: {response.status_code}, Response: {response.text}")
             # Cache error metrics
             if cache_request:
                 duration_ms = int((time.time() - start_time) * 1000)
@@ -194,19 +384,38 @@ async def get_service_metrics(request: ServiceMetricsRequest, credentials: HSPCr
                 metrics_data = {
                     "duration_ms": duration_ms,
                     "endpoint": "serviceMetrics",
-                    "status_code": 0,
+                    "status_code": response.status_code,
+                    "request_size": len(payload_bytes),
+                    "response_size": len(response.text),
                     "route": f"{request.from_loc}->{request.to_loc}",
-                    "error": str(e)
+                    "error": f"HTTP {response.status_code}: {response.text[:100]}"
                 }
                 cache_manager.cache_metrics(rid, metrics_data)
-            raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"HSP API error: Status {response.status_code} - {response.text}")
+        else:
+            raise HTTPException(status_code=500, detail=f"HSP API error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Exception: {e}")
+        # Cache error metrics
+        if cache_request:
+            duration_ms = int((time.time() - start_time) * 1000)
+            rid = cache_manager.generate_rid()
+            metrics_data = {
+                "duration_ms": duration_ms,
+                "endpoint": "serviceMetrics",
+                "status_code": 0,
+                "route": f"{request.from_loc}->{request.to_loc}",
+                "error": str(e)
+            }
+            cache_manager.cache_metrics(rid, metrics_data)
+        raise HTTPException(status_code=500, detail=f"Request failed: {str(e)}")
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
 @app.get("/api/v1/stations/autocomplete")
-async def autocomplete_stations(query: str, limit: int = 10):
+async def autocomplete_stations(request: Request, response: Response, query: str, limit: int = 10):
     """
     Autocomplete station names and codes.
 
@@ -217,54 +426,38 @@ async def autocomplete_stations(query: str, limit: int = 10):
     Returns:
         List of matching stations with their codes and names
     """
+    # The station list is static, so browsers may reuse an answer for a day and then revalidate
+    if request.headers.get("if-none-match") == STATION_INDEX_ETAG:
+        return Response(status_code=304, headers={"ETag": STATION_INDEX_ETAG, "Cache-Control": AUTOCOMPLETE_CACHE_CONTROL})
+    response.headers["ETag"] = STATION_INDEX_ETAG
+    response.headers["Cache-Control"] = AUTOCOMPLETE_CACHE_CONTROL
+
     if not query or len(query) < 1:
         return []
 
     query_upper = query.upper()
-    matches = []
 
     # Check if query looks like a 3-letter code
     is_code_query = len(query) == 3 and query.isalpha()
 
-    for code, name in ALL_STATION_CODES.items():
-        # Match by code (exact or prefix)
-        if code.startswith(query_upper):
-            matches.append({
-                "code": code,
-                "name": name,
-                "match_type": "code",
-                "display": f"{name} ({code})"
-            })
-        # Match by name (case-insensitive)
-        elif name.upper().startswith(query_upper):
-            matches.append({
-                "code": code,
-                "name": name,
-                "match_type": "name",
-                "display": f"{name} ({code})"
-            })
-        # Match by name containing query (lower priority)
-        elif not is_code_query and query_upper in name.upper():
-            matches.append({
-                "code": code,
-                "name": name,
-                "match_type": "partial",
-                "display": f"{name} ({code})"
-            })
-
-    # Sort matches: exact code matches first, then name prefix matches, then partial matches
-    def sort_key(match):
-        if match["match_type"] == "code":
-            # Exact code match has highest priority
-            return (0, match["code"] == query_upper, match["name"])
-        elif match["match_type"] == "name":
-            return (1, match["name"])
-        else:
-            return (2, match["name"])
-
-    matches.sort(key=sort_key, reverse=True)
+    # Stop once limit matches are ranked; a negative limit keeps slice semantics (all but the
+    # last few), which needs every match
+    ranked = rank_station_matches(query_upper, include_partial=not is_code_query)
+    if limit >= 0:
+        ranked = islice(ranked, limit)
+    else:
+        ranked = list(ranked)[:limit]
 
-    return matches[:limit]
+    matches = []
+    for position, match_type in ranked:
+        code, name, _ = STATION_ENTRIES[position]
+        matches.append({
+            "code": code,
+            "name": name,
+            "match_type": match_type,
+            "display": f"{name} ({code})"
+        })
+    return matches
 
 @app.get("/")
 async def root():
@@ -292,7 +485,7 @@ async def request_service_metrics():
     )
     try:
         print(request, credentials)
-        result = await get_service_metrics(request, credentials)
+        result = await get_service_metrics(request, credentials, app.state.http)
         return result
 
     except HTTPException:
@@ -314,7 +507,7 @@ async def request_simple_service_metrics():
     )
 
     try:
-        result = await get_service_metrics(request, credentials)
+        result = await get_service_metrics(request, credentials, app.state.http)
         logger.info(result)
         return result
     except HTTPException:
@@ -322,6 +515,42 @@ async def request_simple_service_metrics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# Delay histogram buckets in whole minutes. Each edge opens the next bucket, so "2-3 min early"
+# is exactly -2 and "2-3 min late" is 2..3; anything more than 5 min early has no bucket.
+DELAY_BUCKET_LABELS = [
+    "3-5 min early",
+    "2-3 min early",
+    "On time (±1 min)",
+    "2-3 min late",
+    "3-5 min late",
+    "5-10 min late",
+    "10-15 min late",
+    "15-30 min late",
+    "30+ min late",
+]
+DELAY_BUCKET_EDGES = np.array([-5, -2, -1, 2, 4, 6, 11, 16, 31])
+# Sentinel for an empty slot in int32 delay buffers; no real delay comes anywhere near it
+DELAY_MISSING = np.iinfo(np.int32).min
+
+# Delays are whole minutes within ±12h (see calculate_delay_minutes), so every possible value's
+# bucket is precomputed once; index 0 means "below the first edge", which is not a bucket
+DELAY_LUT_RANGE = 12 * 60
+DELAY_BUCKET_LUT = np.digitize(
+    np.arange(-DELAY_LUT_RANGE, DELAY_LUT_RANGE + 1), DELAY_BUCKET_EDGES
+).astype(np.int8)
+
+def count_delay_buckets(delays: np.ndarray) -> np.ndarray:
+    """Count delays per DELAY_BUCKET_LABELS entry in a single vectorized pass"""
+    # One table gather replaces the per-element bin search; clipping is only a guard and
+    # can't move a delay across an edge
+    bins = DELAY_BUCKET_LUT[np.clip(delays, -DELAY_LUT_RANGE, DELAY_LUT_RANGE) + DELAY_LUT_RANGE]
+    return np.bincount(bins, minlength=len(DELAY_BUCKET_EDGES) + 1)[1:]
+
+@lru_cache(maxsize=2048)
+def hhmm_to_minutes(hhmm: str) -> int:
+    """Convert an HHMM time to minutes since midnight (a day only has 1440 distinct times)"""
+    return int(hhmm[:2]) * 60 + int(hhmm[2:])
+
 def calculate_delay_minutes(scheduled_time: str, actual_time: str) -> Optional[int]:
     """
     Calculate delay in minutes between scheduled and actual time
@@ -343,14 +572,8 @@ def calculate_delay_minutes(scheduled_time: str, actual_time: str) -> Optional[i
         return 0
 
     try:
-        # Convert HHMM format to minutes since midnight
-        sch_hours = int(scheduled_time[:2])
-        sch_minutes = int(scheduled_time[2:])
-        act_hours = int(actual_time[:2])
-        act_minutes = int(actual_time[2:])
-
-        scheduled_total = sch_hours * 60 + sch_minutes
-        actual_total = act_hours * 60 + act_minutes
+        scheduled_total = hhmm_to_minutes(scheduled_time)
+        actual_total = hhmm_to_minutes(actual_time)
 
         # Handle day rollover - but be more careful about this
         # Only add 24 hours if the difference is more than 12 hours (likely next day)
@@ -364,208 +587,471 @@ def calculate_delay_minutes(scheduled_time: str, actual_time: str) -> Optional[i
     except (ValueError, IndexError):
         return None
 
-def get_station_delays(locations: List[Dict[str, Any]], origin_station: str, destination_station: str) -> tuple[Optional[int], Optional[int], Optional[str], Optional[str]]:
-    """Get departure and arrival delays for specific origin and destination stations, plus cancellation reasons"""
-    departure_delay = None
-    arrival_delay = None
-    departure_cancel_reason = None
-    arrival_cancel_reason = None
-
-    for location in locations:
-        station_code = location.get("location", "")
-
-        # Check for departure from origin station
-        if station_code == origin_station:
-            scheduled_dep = location.get("gbtt_ptd", "")
-            actual_dep = location.get("actual_td", "")
-            cancel_reason = location.get("late_canc_reason", "")
-
-            if scheduled_dep:
-                if actual_dep:
-                    departure_delay = calculate_delay_minutes(scheduled_dep, actual_dep)
-                elif cancel_reason:
-                    # Has cancellation reason but no actual time = cancelled
-                    departure_cancel_reason = cancel_reason
-                else:
-                    # No actual time and no reason = cancelled (reason unknown)
-                    departure_cancel_reason = "Service cancelled"
-
-        # Check for arrival at destination station
-        if station_code == destination_station:
-            scheduled_arr = location.get("gbtt_pta", "")
-            actual_arr = location.get("actual_ta", "")
-            cancel_reason = location.get("late_canc_reason", "")
-
-            if scheduled_arr:
-                if actual_arr:
-                    arrival_delay = calculate_delay_minutes(scheduled_arr, actual_arr)
-                elif cancel_reason:
-                    # Has cancellation reason but no actual time = cancelled
-                    arrival_cancel_reason = cancel_reason
-                else:
-                    # No actual time and no reason = cancelled (reason unknown)
-                    arrival_cancel_reason = "Service cancelled"
+# Place values of the four HHMM digits, turning them straight into minutes since midnight
+HHMM_DIGIT_MINUTES = np.array([600, 60, 10, 1], dtype=np.int32)
 
-    return departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason
+def hhmm_array_to_minutes(times: List[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Minutes since midnight for each HHMM string, plus a mask of which ones were valid
+    (exactly four ASCII digits once surrounding whitespace is stripped).
+    """
+    # A five-character array leaves one spare code point per row, which is only zero padding
+    # when the string has at most four characters
+    stripped = np.char.strip(np.asarray(times, dtype=str))
+    code_points = stripped.astype("U5").view(np.uint32).reshape(-1, 5).astype(np.int32)
+    digits = code_points[:, :4] - ord("0")
+    valid = ((digits >= 0) & (digits <= 9)).all(axis=1) & (code_points[:, 4] == 0)
+    return digits @ HHMM_DIGIT_MINUTES, valid
+
+def delay_minutes_array(scheduled_times: List[str], actual_times: List[str]) -> np.ndarray:
+    """
+    Vectorized calculate_delay_minutes over paired HHMM strings.
+    Times may be padded with whitespace; pairs that are missing or not four digits after
+    stripping are dropped from the result.
+    """
+    if not scheduled_times:
+        return np.empty(0, dtype=np.int32)
+
+    # Digits are read straight from the strings' code points rather than parsed as text
+    scheduled_total, scheduled_valid = hhmm_array_to_minutes(scheduled_times)
+    actual_total, actual_valid = hhmm_array_to_minutes(actual_times)
+    valid = scheduled_valid & actual_valid
+
+    # Same day-rollover rule as calculate_delay_minutes: a 12h+ gap means the other day
+    diff = (actual_total - scheduled_total)[valid]
+    diff = np.where(diff < -720, diff + 24 * 60, np.where(diff > 720, diff - 24 * 60, diff))
+    return diff.astype(np.int32)
+
+# Uniform 3-minute bins from 0 to 30 minutes for the fixed-route histogram - no negative bins
+# since early running counts as "0 to 3"
+MINUTE_BIN_WIDTH = 3
+MINUTE_BIN_LIMIT = 30
+MINUTE_BIN_LABELS = tuple(
+    f"{start} to {start + MINUTE_BIN_WIDTH}" for start in range(0, MINUTE_BIN_LIMIT, MINUTE_BIN_WIDTH)
+)
 
-async def get_service_details_by_rid(rid: str, credentials: HSPCredentials, cache_request: bool = True, max_retries: int = 3) -> Optional[Dict[str, Any]]:
-    """Get service details for a specific RID with retry logic for rate limiting"""
-    start_time = time.time()
+def count_minute_bins(delays: np.ndarray) -> Dict[str, int]:
+    """Histogram delays into MINUTE_BIN_LABELS, with anything at or past the limit in a "30+ min" bin"""
+    # Equal-width bins index directly by integer division, no bin search needed; early delays
+    # clamp into the first bin and late ones into one overflow slot past the last label
+    bin_count = len(MINUTE_BIN_LABELS)
+    indices = np.minimum(np.maximum(delays, 0) // MINUTE_BIN_WIDTH, bin_count)
+    counts = np.bincount(indices, minlength=bin_count + 1).tolist()
+
+    histogram = dict(zip(MINUTE_BIN_LABELS, counts))
+    if counts[bin_count] > 0:
+        histogram[f"{MINUTE_BIN_LIMIT}+ min"] = counts[bin_count]
+    return histogram
+
+def create_enhanced_histogram(delays: np.ndarray, cancelled_count: int = 0) -> Dict[str, Any]:
+    """Create histogram with realistic train delay buckets as percentages"""
+    # Calculate raw counts first, with cancellations as a trailing bucket when there are any
+    delays_arr = np.asarray(delays, dtype=np.int32)
+    bucket_counts = count_delay_buckets(delays_arr)
+    counts_arr = bucket_counts
+    labels = DELAY_BUCKET_LABELS
+    if cancelled_count > 0:
+        counts_arr = np.append(counts_arr, cancelled_count)
+        labels = DELAY_BUCKET_LABELS + ["Cancelled"]
+    counts = dict(zip(labels, counts_arr.tolist()))
+
+    # Calculate total for percentage calculation
+    total_count = len(delays) + cancelled_count
+
+    # Convert all counts to percentages at once
+    if total_count > 0:
+        percentages = np.round(counts_arr / total_count * 100, 1).tolist()
+    else:
+        percentages = [0.0] * len(labels)
+    histogram = dict(zip(labels, percentages))
+
+    # Statistics - "on time" is ±1 minute. These line up with bucket boundaries, so they come
+    # from the bucket counts; early is whatever remains, including delays below every bucket
+    on_time_count = int(bucket_counts[2])
+    late_count = int(bucket_counts[3:].sum())
+    early_count = int(delays_arr.size) - on_time_count - late_count
+    extreme_delays = int(bucket_counts[-1])
+
+    stats = {
+        "avg_delay": round(float(delays_arr.mean()), 1) if delays_arr.size else 0,
+        "early_count": early_count,  # More than 1 min early
+        "on_time_count": on_time_count,  # ±1 minute
+        "late_count": late_count,  # More than 1 min late
+        "extreme_delays": extreme_delays,  # >30 min late
+        "cancelled_count": cancelled_count,
+        "total_count": total_count,
+        # Add percentage stats for easy access
+        "on_time_percentage": round((on_time_count / total_count) * 100, 1) if total_count > 0 else 0.0,
+        "early_percentage": round((early_count / total_count) * 100, 1) if total_count > 0 else 0.0,
+        "late_percentage": round((late_count / total_count) * 100, 1) if total_count > 0 else 0.0,
+        "cancelled_percentage": round((cancelled_count / total_count) * 100, 1) if total_count > 0 else 0.0
+    }
 
-    auth_string = base64.b64encode(f"{credentials.email}:{credentials.password}".encode()).decode()
+    return {"histogram": histogram, "stats": stats, "raw_counts": counts}
 
-    headers = {
-        "Authorization": f"Basic {auth_string}",
-        "Content-Type": "application/json"
-    }
+def station_delay_or_cancel_reason(location: Dict[str, Any], scheduled_key: str, actual_key: str) -> tuple[Optional[int], Optional[str]]:
+    """Delay at one calling point, or the cancellation reason when no actual time was recorded"""
+    actual_time = location.get(actual_key, "")
+    if actual_time:
+        return calculate_delay_minutes(location[scheduled_key], actual_time), None
+
+    # No actual time = cancelled, with HSP's reason when it gives one
+    return None, location.get("late_canc_reason", "") or "Service cancelled"
 
-    # Read-through cache first by service name
+def make_station_delay_extractor(origin_station: str, destination_station: str) -> Callable[[List[Dict[str, Any]]], tuple[Optional[int], Optional[int], Optional[str], Optional[str]]]:
+    """
+    Build a locations -> (departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason)
+    function specialised to one origin/destination pair.
+
+    A journey analysis checks the same two stations for every RID, so bind them once and
+    only keep the scheduled calls that match while walking each RID's locations.
+    """
+    def extract(locations: List[Dict[str, Any]]) -> tuple[Optional[int], Optional[int], Optional[str], Optional[str]]:
+        departure_delay = None
+        arrival_delay = None
+        departure_cancel_reason = None
+        arrival_cancel_reason = None
+
+        # The last scheduled departure from the origin / arrival at the destination wins
+        origin = None
+        destination = None
+        for location in locations:
+            station_code = location.get("location", "")
+            if station_code == origin_station and location.get("gbtt_ptd"):
+                origin = location
+            if station_code == destination_station and location.get("gbtt_pta"):
+                destination = location
+
+        if origin is not None:
+            departure_delay, departure_cancel_reason = station_delay_or_cancel_reason(origin, "gbtt_ptd", "actual_td")
+        if destination is not None:
+            arrival_delay, arrival_cancel_reason = station_delay_or_cancel_reason(destination, "gbtt_pta", "actual_ta")
+
+        return departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason
+
+    return extract
+
+def retry_backoff_seconds(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Exponential backoff with full jitter, honouring a Retry-After header when HSP sends one.
+
+    Retry-After may be seconds or an HTTP date; either way the wait is capped at
+    MAX_RETRY_AFTER_SECONDS so one worker can't stall a whole batch.
+    """
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(0.0, delay), MAX_RETRY_AFTER_SECONDS)
+    # Full jitter keeps concurrent RID fetches from retrying in lockstep
+    return random.uniform(0, 0.5 * (2 ** attempt))  # up to 0.5s, 1s, 2s
+
+async def get_service_details_by_rid(rid: str, credentials: HSPCredentials, client: httpx.AsyncClient, cache_request: bool = True, max_retries: int = 3) -> Optional[Dict[str, Any]]:
+    """Get service details for a specific RID with retry logic for rate limiting.
+
+    The caller owns ``client`` so a whole batch of RIDs shares one connection pool.
+    """
+    start_time = time.time()
+
+    # Read-through cache first by service name, before building the request
     cached_service_name = f"details_{rid}"
     cached = cache_manager.get_cached_service_by_name(cached_service_name)
-    if cached and isinstance(cached.get("response"), dict):
-        logger.info(f"✅ Cache hit for %s; returning cached details", cached_service_name)
-        return cached["response"]
+    if cached and isinstance(cached.response, dict):
+        logger.debug(f"✅ Cache hit for %s; returning cached details", cached_service_name)
+        return cached.response
     else:
-        logger.info(f"❌ Cache miss for %s; fetching from API", cached_service_name)
+        logger.debug(f"❌ Cache miss for %s; fetching from API", cached_service_name)
 
-    async with httpx.AsyncClient(timeout=180.0) as client:
-        payload = {"rid": rid}
+    headers = hsp_headers(credentials.email, credentials.password)
 
-        # Retry loop with exponential backoff
-        for attempt in range(max_retries):
-            try:
-                response = await client.post(DETAILS, headers=headers, json=payload)
-
-                if response.status_code == 200:
-                    response_data = response.json()
-
-                    # Cache the request and response if enabled
-                    if cache_request:
-                        duration_ms = int((time.time() - start_time) * 1000)
-                        cache_rid = cache_manager.generate_rid()
-
-                        # Cache metrics
-                        metrics_data = {
-                            "duration_ms": duration_ms,
-                            "endpoint": "serviceDetails",
-                            "status_code": response.status_code,
-                            "request_size": len(json.dumps(payload)),
-                            "response_size": len(json.dumps(response_data)),
-                            "route": f"details_{rid}",
-                            "services_count": 1
-                        }
-                        cache_manager.cache_metrics(cache_rid, metrics_data)
-
-                        # Cache detailed service request
-                        service_name = f"details_{rid}"
-                        cache_manager.cache_service_request(service_name, payload, response_data, cache_rid)
-
-                        logger.debug(f"Cached service details request for RID {rid} with cache RID: {cache_rid}")
-
-                    return response_data
-
-                elif response.status_code == 503 and attempt < max_retries - 1:
-                    # Rate limited - retry with exponential backoff
-                    backoff_time = (2 ** attempt) * 0.5  # 0.5s, 1s, 2s
-                    logger.warning(f"RID {rid}: HTTP 503 (attempt {attempt + 1}/{max_retries}), retrying in {backoff_time}s...")
-                    await asyncio.sleep(backoff_time)
-                    continue
+    payload = {"rid": rid}
+    # Serialized once and reused for every retry and the cache metrics
+    payload_bytes = orjson.dumps(payload)
 
-                else:
-                    # Other error or final retry attempt
-                    logger.warning(f"RID {rid}: HTTP {response.status_code} - {response.text[:100]}")
-                    if cache_request:
-                        duration_ms = int((time.time() - start_time) * 1000)
-                        cache_rid = cache_manager.generate_rid()
-                        metrics_data = {
-                            "duration_ms": duration_ms,
-                            "endpoint": "serviceDetails",
-                            "status_code": response.status_code,
-                            "route": f"details_{rid}",
-                            "error": f"HTTP {response.status_code}: {response.text[:100]}"
-                        }
-                        cache_manager.cache_metrics(cache_rid, metrics_data)
-                    return None
-
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    backoff_time = (2 ** attempt) * 0.5
-                    logger.warning(f"RID {rid}: Exception (attempt {attempt + 1}/{max_retries}) - {str(e)}, retrying in {backoff_time}s...")
-                    await asyncio.sleep(backoff_time)
-                    continue
-                else:
-                    logger.warning(f"RID {rid}: Exception (final attempt) - {str(e)}")
-                    if cache_request:
-                        duration_ms = int((time.time() - start_time) * 1000)
-                        cache_rid = cache_manager.generate_rid()
-                        metrics_data = {
-                            "duration_ms": duration_ms,
-                            "endpoint": "serviceDetails",
-                            "status_code": 0,
-                            "route": f"details_{rid}",
-                            "error": str(e)
-                        }
-                        cache_manager.cache_metrics(cache_rid, metrics_data)
-                    return None
+    # Retry loop with exponential backoff
+    for attempt in range(max_retries):
+        # Fail fast while HSP is known to be degraded instead of queueing more doomed requests
+        if not hsp_breaker.allow_request():
+            logger.warning(f"RID {rid}: HSP circuit open, skipping request")
+            return None
 
-        return None
+        try:
+            response = await client.post(DETAILS, headers=headers, content=payload_bytes)
+            hsp_breaker.record_response(response.status_code)
+
+            if response.status_code == 200:
+                response_data = orjson.loads(response.content)
 
-async def fetch_service_details_concurrently(
+                # Cache the request and response if enabled
+                if cache_request:
+                    duration_ms = int((time.time() - start_time) * 1000)
+                    cache_rid = cache_manager.generate_rid()
+
+                    # Cache metrics
+                    metrics_data = {
+                        "duration_ms": duration_ms,
+                        "endpoint": "serviceDetails",
+                        "status_code": response.status_code,
+                        "request_size": len(payload_bytes),
+                        "response_size": len(response.content),
+                        "route": f"details_{rid}",
+                        "services_count": 1
+                    }
+                    cache_manager.cache_metrics(cache_rid, metrics_data)
+
+                    # Cache detailed service request; RIDs start with the YYYYMMDD the service ran
+                    service_name = f"details_{rid}"
+                    cache_manager.cache_service_request(
+                        service_name, payload, response_data, cache_rid,
+                        ttl_seconds=hsp_cache_ttl(rid[:8], "%Y%m%d")
+                    )
+
+                    logger.debug(f"Cached service details request for RID {rid} with cache RID: {cache_rid}")
+
+                return response_data
+
+            elif response.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries - 1:
+                # Rate limited or transient server error - retry with jittered backoff
+                backoff_time = retry_backoff_seconds(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"RID {rid}: HTTP {response.status_code} (attempt {attempt + 1}/{max_retries}), retrying in {backoff_time:.2f}s...")
+                await asyncio.sleep(backoff_time)
+                continue
+
+            else:
+                # Other error or final retry attempt
+                logger.warning(f"RID {rid}: HTTP {response.status_code} - {response.text[:100]}")
+                if cache_request:
+                    duration_ms = int((time.time() - start_time) * 1000)
+                    cache_rid = cache_manager.generate_rid()
+                    metrics_data = {
+                        "duration_ms": duration_ms,
+                        "endpoint": "serviceDetails",
+                        "status_code": response.status_code,
+                        "route": f"details_{rid}",
+                        "error": f"HTTP {response.status_code}: {response.text[:100]}"
+                    }
+                    cache_manager.cache_metrics(cache_rid, metrics_data)
+                return None
+
+        except Exception as e:
+            if isinstance(e, httpx.TransportError):
+                hsp_breaker.record_failure()
+
+            # Only network-level failures (timeouts, resets) are transient
+            if isinstance(e, httpx.TransportError) and attempt < max_retries - 1:
+                backoff_time = retry_backoff_seconds(attempt)
+                logger.warning(f"RID {rid}: Exception (attempt {attempt + 1}/{max_retries}) - {str(e)}, retrying in {backoff_time:.2f}s...")
+                await asyncio.sleep(backoff_time)
+                continue
+            else:
+                logger.warning(f"RID {rid}: Exception (final attempt) - {str(e)}")
+                if cache_request:
+                    duration_ms = int((time.time() - start_time) * 1000)
+                    cache_rid = cache_manager.generate_rid()
+                    metrics_data = {
+                        "duration_ms": duration_ms,
+                        "endpoint": "serviceDetails",
+                        "status_code": 0,
+                        "route": f"details_{rid}",
+                        "error": str(e)
+                    }
+                    cache_manager.cache_metrics(cache_rid, metrics_data)
+                return None
+
+    return None
+
+def extract_rids(services: List[Dict[str, Any]]) -> List[str]:
+    """Collect unique RIDs from serviceMetrics service patterns, preserving their order.
+
+    RIDs are in serviceAttributesMetrics.rids as arrays; each RID is a different journey/day.
+    """
+    patterns = hsp_service_patterns.validate_python([service for service in services if isinstance(service, dict)])
+
+    rids = []
+    seen = set()
+    for i, pattern in enumerate(patterns, 1):
+        attributes = pattern.serviceAttributesMetrics
+        if attributes is not None and attributes.rids:
+            # Skip RIDs already listed under another pattern so each journey is fetched once
+            new_rids = [rid for rid in attributes.rids if rid not in seen]
+            seen.update(new_rids)
+            rids.extend(new_rids)
+            logger.info(f"  📋 Service {i}: {attributes.gbtt_ptd}→{attributes.gbtt_pta} - {len(attributes.rids)} RIDs")
+    return rids
+
+async def stream_service_details(
     rids: List[str],
     credentials: HSPCredentials,
-    max_concurrent: int = 3,
-    rate_limit_delay: float = 0.2,
-    progress_callback=None
-) -> List[tuple[str, Optional[Dict[str, Any]]]]:
+    client: httpx.AsyncClient,
+    max_concurrent: int = HSP_MAX_CONCURRENT,
+    rate_limit_delay: float = 0.2
+) -> AsyncIterator[tuple[int, str, Optional[Dict[str, Any]]]]:
     """
-    Fetch service details for multiple RIDs concurrently with rate limiting.
+    Fetch service details for multiple RIDs concurrently, yielding each one as it arrives.
 
-    Args:
-        rids: List of RIDs to fetch (each RID is a different journey/date)
-        credentials: HSP credentials
-        max_concurrent: Maximum number of concurrent requests (default 3 to avoid 503 errors)
-        rate_limit_delay: Delay in seconds between starting requests (default 0.2s)
-        progress_callback: Optional sync or async callback function called with (current, total) progress
-
-    Returns:
-        List of tuples (rid, service_data) maintaining order of input rids
+    Yields (index, rid, service_data) in completion order, where index is the RID's position in
+    rids, so callers can work on one response while the next requests are still in flight.
+    Fetches that raise are logged and skipped.
     """
-    semaphore = asyncio.Semaphore(max_concurrent)
-    completed_count = 0
-    import inspect
-
-    async def fetch_with_semaphore(rid: str, index: int) -> tuple[int, str, Optional[Dict[str, Any]]]:
-        nonlocal completed_count
-        async with semaphore:
-            # Add small delay to avoid overwhelming the API
-            if index > 0:
-                await asyncio.sleep(rate_limit_delay)
-
-            service_data = await get_service_details_by_rid(rid, credentials)
-            completed_count += 1
-
-            if progress_callback:
-                # Support both sync and async callbacks
-                if inspect.iscoroutinefunction(progress_callback):
-                    await progress_callback(completed_count, len(rids))
-                else:
-                    progress_callback(completed_count, len(rids))
+    # RIDs already in the cache are served straight away; only the rest go through the
+    # rate-limited worker pool
+    cached_hits = []
+    pending: asyncio.Queue = asyncio.Queue()
+    for index, rid in enumerate(rids):
+        cached = cache_manager.get_cached_service_by_name(f"details_{rid}")
+        if cached and isinstance(cached.response, dict):
+            cached_hits.append((index, rid, cached.response))
+        else:
+            pending.put_nowait((index, rid))
+    completed: asyncio.Queue = asyncio.Queue()
 
-            return (index, rid, service_data)
+    async def worker():
+        try:
+            while True:
+                try:
+                    index, rid = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                # Add small delay to avoid overwhelming the API
+                if index > 0:
+                    await asyncio.sleep(rate_limit_delay)
+
+                try:
+                    service_data = await get_service_details_by_rid(rid, credentials, client)
+                except Exception as e:
+                    logger.warning(f"RID {rid}: fetch failed - {e}")
+                    continue
 
-    # Create tasks for all RIDs with their original indices
-    tasks = [fetch_with_semaphore(rid, i) for i, rid in enumerate(rids)]
+                completed.put_nowait((index, rid, service_data))
+        finally:
+            # None tells the consumer this worker is finished
+            completed.put_nowait(None)
 
-    # Gather all results concurrently
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # A fixed pool of workers drains the queue instead of one task per RID
+    workers = [asyncio.create_task(worker()) for _ in range(min(max_concurrent, pending.qsize()))]
+    try:
+        for item in cached_hits:
+            yield item
+
+        running = len(workers)
+        while running:
+            item = await completed.get()
+            if item is None:
+                running -= 1
+                continue
+            yield item
+    finally:
+        for task in workers:
+            task.cancel()
+
+async def stream_station_delays(
+    rids: List[str],
+    from_loc: str,
+    to_loc: str,
+    credentials: HSPCredentials,
+    client: httpx.AsyncClient
+) -> AsyncIterator[tuple[int, str, Optional[tuple]]]:
+    """
+    Station delays for each RID on one route, yielded as (index, rid, delays) once available.
 
-    # Sort by original index to maintain order and extract (rid, data) tuples
-    sorted_results = sorted(
-        [(r[1], r[2]) for r in results if not isinstance(r, Exception)],
-        key=lambda x: rids.index(x[0])
+    delays is make_station_delay_extractor's tuple, or None when HSP had no location data for the RID.
+    Results for services that ran over a week ago are cached per route, so a repeat analysis
+    only fetches the RIDs it has not seen before.
+    """
+    # HSP location codes are upper case; the cache key ignores case but the extractor doesn't,
+    # so a lowercase request would otherwise cache empty delays under the real route
+    from_loc, to_loc = from_loc.upper(), to_loc.upper()
+
+    cached = cache_manager.get_station_delays_bulk(rids, from_loc, to_loc)
+    missing = []
+    for index, rid in enumerate(rids):
+        if rid in cached:
+            yield index, rid, cached[rid]
+        else:
+            missing.append(index)
+
+    extract_station_delays = make_station_delay_extractor(from_loc, to_loc)
+    fresh = []
+    async for position, rid, service_data in stream_service_details(
+        [rids[index] for index in missing], credentials, client
+    ):
+        delays = None
+        if service_data and "serviceAttributesDetails" in service_data:
+            locations = service_data.get("serviceAttributesDetails", {}).get("locations", [])
+
+            if locations:
+                delays = extract_station_delays(locations)
+                # Only final (historical) runs are worth keeping; RIDs start with their run date
+                if hsp_cache_ttl(rid[:8], "%Y%m%d") == HISTORICAL_CACHE_TTL:
+                    fresh.append((rid, *delays))
+        else:
+            logger.debug(f"⚠️  No detailed data for RID: {rid}")
+
+        yield missing[position], rid, delays
+
+    cache_manager.cache_station_delays_bulk(from_loc, to_loc, fresh)
+
+# Finished journey analyses are kept briefly so a follow-up request for the same route (the AI
+# analysis the frontend asks for right after the journey view) reuses them instead of redoing
+# every RID lookup
+JOURNEY_RESULT_TTL = 60.0
+JOURNEY_RESULT_MAX_ENTRIES = 128
+_journey_results: Dict[tuple, tuple[float, Dict[str, Any]]] = {}
+# Per-route lock and the number of callers holding or waiting on it; dropped when that reaches 0
+_journey_locks: Dict[tuple, List] = {}
+
+def journey_cache_key(request: ServiceMetricsRequest) -> tuple:
+    """Identify a journey analysis by every request field that shapes its result"""
+    return (
+        request.from_loc, request.to_loc, request.from_time, request.to_time,
+        request.from_date, request.to_date, request.days,
+        tuple(request.toc_filter or ()), tuple(request.tolerance or ())
     )
 
-    return sorted_results
+def remember_journey_result(request: ServiceMetricsRequest, result: Dict[str, Any]) -> None:
+    """Keep a finished journey analysis for JOURNEY_RESULT_TTL seconds"""
+    key = journey_cache_key(request)
+    _journey_results.pop(key, None)
+    _journey_results[key] = (time.monotonic() + JOURNEY_RESULT_TTL, result)
+    # Entries are in insertion order, so the oldest go first once over the limit
+    while len(_journey_results) > JOURNEY_RESULT_MAX_ENTRIES:
+        oldest = next(iter(_journey_results))
+        del _journey_results[oldest]
+
+def recent_journey_result(request: ServiceMetricsRequest) -> Optional[Dict[str, Any]]:
+    """A journey analysis finished within the last JOURNEY_RESULT_TTL seconds, if any"""
+    key = journey_cache_key(request)
+    entry = _journey_results.get(key)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if time.monotonic() >= expires_at:
+        del _journey_results[key]
+        return None
+    return result
+
+async def analyze_journey_cached(request: ServiceMetricsRequest) -> Dict[str, Any]:
+    """analyze_journey, reusing a recent result; concurrent callers for one route share a single run"""
+    key = journey_cache_key(request)
+    entry = _journey_locks.get(key)
+    if entry is None:
+        entry = _journey_locks[key] = [asyncio.Lock(), 0]
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            result = recent_journey_result(request)
+            if result is None:
+                result = await analyze_journey(request)
+            return result
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _journey_locks[key]
 
 @app.post("/api/v1/journey-analysis")
 async def analyze_journey(request: ServiceMetricsRequest):
@@ -583,7 +1069,7 @@ async def analyze_journey(request: ServiceMetricsRequest):
 
         logger.info("🔐 Credentials loaded, requesting service metrics...")
         # Get service metrics data for the specified route and date range
-        metrics_data = await get_service_metrics(request, credentials)
+        metrics_data = await get_service_metrics(request, credentials, app.state.http)
 
         if not metrics_data or "Services" not in metrics_data:
             logger.error("❌ No service data found in API response")
@@ -594,131 +1080,70 @@ async def analyze_journey(request: ServiceMetricsRequest):
 
         # Extract RIDs from services - RIDs are in serviceAttributesMetrics.rids as arrays
         logger.info("🔍 Extracting RIDs from service patterns...")
-        rids = []
-        for i, service in enumerate(services, 1):
-            if isinstance(service, dict) and "serviceAttributesMetrics" in service:
-                service_rids = service["serviceAttributesMetrics"].get("rids", [])
-                departure_time = service["serviceAttributesMetrics"].get("gbtt_ptd", "unknown")
-                arrival_time = service["serviceAttributesMetrics"].get("gbtt_pta", "unknown")
-                if service_rids:
-                    rids.extend(service_rids)  # Add all RIDs from this service (each RID is a different journey/day)
-                    logger.info(f"  📋 Service {i}: {departure_time}→{arrival_time} - {len(service_rids)} RIDs")
+        rids = extract_rids(services)
 
         logger.info(f"🎯 Extracted {len(rids)} total RIDs for detailed analysis (each RID = one journey on a specific date)")
         logger.info("-"*60)
 
-        departure_delays = []
-        arrival_delays = []
-        cancelled_departures = 0
-        cancelled_arrivals = 0
-        cancellation_reasons = {
-            "departure": [],
-            "arrival": []
-        }
-        processed_count = 0
+        # Per-RID results in preallocated arrays indexed by RID position (structure of arrays);
+        # a delay slot only counts where its valid flag is set
+        rid_count = len(rids)
+        processed = np.zeros(rid_count, dtype=bool)
+        departure = np.zeros(rid_count, dtype=np.int32)
+        departure_valid = np.zeros(rid_count, dtype=bool)
+        departure_cancel_reasons: List[Optional[str]] = [None] * rid_count
+        arrival = np.zeros(rid_count, dtype=np.int32)
+        arrival_valid = np.zeros(rid_count, dtype=bool)
+        arrival_cancel_reasons: List[Optional[str]] = [None] * rid_count
 
         # Process RIDs concurrently (up to 3 at a time to avoid overwhelming API)
-        logger.info(f"🔄 Processing {len(rids)} individual journeys concurrently (max 3 at a time)...")
-        progress_interval = max(1, len(rids) // 20)  # Show progress every 5%
-
-        def progress_callback(current, total):
-            if current % progress_interval == 0 or current == total:
-                progress = (current / total) * 100
-                logger.info(f"  ⏳ Progress: {current}/{total} ({progress:.0f}%)")
-
-        # Fetch all service details concurrently (max 3 to avoid rate limiting)
-        service_results = await fetch_service_details_concurrently(
-            rids, credentials, max_concurrent=3, progress_callback=progress_callback
-        )
-
-        # Process results
-        for rid, service_data in service_results:
-            if service_data and "serviceAttributesDetails" in service_data:
-                locations = service_data.get("serviceAttributesDetails", {}).get("locations", [])
-
-                if locations:
-                    processed_count += 1
-
-                    # Get delays for the specific origin and destination stations with cancellation reasons
-                    dep_delay, arr_delay, dep_cancel_reason, arr_cancel_reason = get_station_delays(
-                        locations, request.from_loc, request.to_loc
-                    )
-
-                    # Handle departure delays (including early, on-time, late, and cancelled)
-                    if dep_delay is not None:
-                        departure_delays.append(dep_delay)
-                    elif dep_cancel_reason:
-                        cancelled_departures += 1
-                        cancellation_reasons["departure"].append(dep_cancel_reason)
-                    else:
-                        cancelled_departures += 1
-                        cancellation_reasons["departure"].append("No data available")
+        logger.info(f"🔄 Processing {rid_count} individual journeys concurrently (max {HSP_MAX_CONCURRENT} at a time)...")
+        progress_interval = max(1, rid_count // 20)  # Show progress every 5%
+
+        # Extract station delays as each response lands, overlapping that work with the
+        # requests still in flight
+        completed_count = 0
+        async for index, rid, delays in stream_station_delays(
+            rids, request.from_loc, request.to_loc, credentials, app.state.http
+        ):
+            completed_count += 1
+            if completed_count % progress_interval == 0 or completed_count == rid_count:
+                progress = (completed_count / rid_count) * 100
+                logger.info(f"  ⏳ Progress: {completed_count}/{rid_count} ({progress:.0f}%)")
+
+            if delays is not None:
+                processed[index] = True
+                dep_delay, arr_delay, dep_cancel_reason, arr_cancel_reason = delays
+
+                # A missing delay means cancelled, with or without a reason from HSP
+                if dep_delay is not None:
+                    departure[index] = dep_delay
+                    departure_valid[index] = True
+                else:
+                    departure_cancel_reasons[index] = dep_cancel_reason or "No data available"
 
-                    # Handle arrival delays (including early, on-time, late, and cancelled)
-                    if arr_delay is not None:
-                        arrival_delays.append(arr_delay)
-                    elif arr_cancel_reason:
-                        cancelled_arrivals += 1
-                        cancellation_reasons["arrival"].append(arr_cancel_reason)
-                    else:
-                        cancelled_arrivals += 1
-                        cancellation_reasons["arrival"].append("No data available")
-            else:
-                logger.debug(f"⚠️  No detailed data for RID: {rid}")
+                if arr_delay is not None:
+                    arrival[index] = arr_delay
+                    arrival_valid[index] = True
+                else:
+                    arrival_cancel_reasons[index] = arr_cancel_reason or "No data available"
+
+        # Aggregate in RID order
+        processed_count = int(np.count_nonzero(processed))
+        departure_delays = departure[departure_valid]
+        arrival_delays = arrival[arrival_valid]
+        cancelled_departures = int(np.count_nonzero(processed & ~departure_valid))
+        cancelled_arrivals = int(np.count_nonzero(processed & ~arrival_valid))
+        cancellation_reasons = {
+            "departure": [reason for reason in departure_cancel_reasons if reason is not None],
+            "arrival": [reason for reason in arrival_cancel_reasons if reason is not None]
+        }
 
         logger.info("-"*60)
         logger.info(f"✅ Successfully processed {processed_count}/{len(rids)} journeys")
         logger.info(f"📊 Departure data: {len(departure_delays)} with times, {cancelled_departures} cancelled")
         logger.info(f"📊 Arrival data: {len(arrival_delays)} with times, {cancelled_arrivals} cancelled")
 
-        def create_enhanced_histogram(delays: List[int], cancelled_count: int = 0) -> Dict[str, Any]:
-            """Create histogram with realistic train delay buckets as percentages"""
-            # Calculate raw counts first
-            counts = {}
-            counts["3-5 min early"] = sum(1 for d in delays if -5 <= d <= -3)
-            counts["2-3 min early"] = sum(1 for d in delays if -3 < d <= -2)
-            counts["On time (±1 min)"] = sum(1 for d in delays if -1 <= d <= 1)
-            counts["2-3 min late"] = sum(1 for d in delays if 1 < d <= 3)
-            counts["3-5 min late"] = sum(1 for d in delays if 3 < d <= 5)
-            counts["5-10 min late"] = sum(1 for d in delays if 5 < d <= 10)
-            counts["10-15 min late"] = sum(1 for d in delays if 10 < d <= 15)
-            counts["15-30 min late"] = sum(1 for d in delays if 15 < d <= 30)
-            counts["30+ min late"] = sum(1 for d in delays if d > 30)
-            if cancelled_count > 0:
-                counts["Cancelled"] = cancelled_count
-
-            # Calculate total for percentage calculation
-            total_count = len(delays) + cancelled_count
-
-            # Convert counts to percentages
-            histogram = {}
-            for bucket, count in counts.items():
-                percentage = round((count / total_count) * 100, 1) if total_count > 0 else 0.0
-                histogram[bucket] = percentage
-
-            # Statistics - "on time" is ±1 minute
-            on_time_count = sum(1 for d in delays if -1 <= d <= 1)
-            early_count = sum(1 for d in delays if d < -1)
-            late_count = sum(1 for d in delays if d > 1)
-            extreme_delays = sum(1 for d in delays if d > 30)
-
-            stats = {
-                "avg_delay": round(sum(delays) / len(delays), 1) if delays else 0,
-                "early_count": early_count,  # More than 1 min early
-                "on_time_count": on_time_count,  # ±1 minute
-                "late_count": late_count,  # More than 1 min late
-                "extreme_delays": extreme_delays,  # >30 min late
-                "cancelled_count": cancelled_count,
-                "total_count": total_count,
-                # Add percentage stats for easy access
-                "on_time_percentage": round((on_time_count / total_count) * 100, 1) if total_count > 0 else 0.0,
-                "early_percentage": round((early_count / total_count) * 100, 1) if total_count > 0 else 0.0,
-                "late_percentage": round((late_count / total_count) * 100, 1) if total_count > 0 else 0.0,
-                "cancelled_percentage": round((cancelled_count / total_count) * 100, 1) if total_count > 0 else 0.0
-            }
-
-            return {"histogram": histogram, "stats": stats, "raw_counts": counts}
-
         logger.info("📈 Generating enhanced histogram data...")
 
         departure_analysis = create_enhanced_histogram(departure_delays, cancelled_departures)
@@ -745,13 +1170,13 @@ async def analyze_journey(request: ServiceMetricsRequest):
                 "histogram": departure_analysis["histogram"],
                 "avg_delay": departure_analysis["stats"]["avg_delay"],
                 "on_time_count": departure_analysis["stats"]["on_time_count"],  # Early to +5 min late
-                "extreme_delays": sum(1 for d in departure_delays if d > 30)
+                "extreme_delays": departure_analysis["stats"]["extreme_delays"]
             },
             "arrival_delays": {
                 "histogram": arrival_analysis["histogram"],
                 "avg_delay": arrival_analysis["stats"]["avg_delay"],
                 "on_time_count": arrival_analysis["stats"]["on_time_count"],  # Early to +5 min late
-                "extreme_delays": sum(1 for d in arrival_delays if d > 30)
+                "extreme_delays": arrival_analysis["stats"]["extreme_delays"]
             },
 
             # Enhanced performance data
@@ -778,6 +1203,7 @@ async def analyze_journey(request: ServiceMetricsRequest):
         logger.info(f"🎯 Service Reliability: Departures {result['departure_performance']['reliability']}%, Arrivals {result['arrival_performance']['reliability']}%")
         logger.info("="*60)
 
+        remember_journey_result(request, result)
         return result
 
     except HTTPException:
@@ -786,164 +1212,87 @@ async def analyze_journey(request: ServiceMetricsRequest):
         logger.error(f"Error generating journey analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating journey analysis: {str(e)}")
 
+def sse_event(payload: Dict[str, Any]) -> bytes:
+    """Frame a payload as one server-sent event"""
+    # Same numpy handling as ORJSONResponse, so stream and JSON endpoints accept the same results
+    return b"data: " + orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n\n"
+
 @app.post("/api/v1/journey-analysis-stream")
 async def analyze_journey_stream(request: ServiceMetricsRequest):
     """Get streaming journey analysis with real-time progress updates"""
 
     async def generate_progress():
         try:
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'initializing', 'message': 'Starting journey analysis...'})}\n\n"
-            await asyncio.sleep(0.1)
+            yield sse_event({'type': 'progress', 'step': 'initializing', 'message': 'Starting journey analysis...'})
 
             credentials = HSPCredentials(email=settings.RAIL_EMAIL, password=settings.RAIL_PWORD)
 
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'fetching_metrics', 'message': 'Fetching service metrics...'})}\n\n"
-            await asyncio.sleep(0.1)
+            yield sse_event({'type': 'progress', 'step': 'fetching_metrics', 'message': 'Fetching service metrics...'})
 
             # Get service metrics data for the specified route and date range
-            metrics_data = await get_service_metrics(request, credentials)
+            metrics_data = await get_service_metrics(request, credentials, app.state.http)
 
             if not metrics_data or "Services" not in metrics_data:
-                yield f"data: {json.dumps({'type': 'error', 'message': 'No service data found for the specified route and date range'})}\n\n"
+                yield sse_event({'type': 'error', 'message': 'No service data found for the specified route and date range'})
                 return
 
             services = metrics_data["Services"]
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'extracting_rids', 'message': f'Found {len(services)} service patterns to analyze'})}\n\n"
-            await asyncio.sleep(0.1)
+            yield sse_event({'type': 'progress', 'step': 'extracting_rids', 'message': f'Found {len(services)} service patterns to analyze'})
 
             # Extract RIDs from services (each RID = one journey on a specific date)
-            rids = []
-            for i, service in enumerate(services, 1):
-                if isinstance(service, dict) and "serviceAttributesMetrics" in service:
-                    service_rids = service["serviceAttributesMetrics"].get("rids", [])
-                    if service_rids:
-                        rids.extend(service_rids)
+            rids = extract_rids(services)
 
             total_rids = len(rids)
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'processing_journeys', 'message': f'Processing {total_rids} journeys...', 'total': total_rids, 'current': 0})}\n\n"
-            await asyncio.sleep(0.1)
-
-            departure_delays = []
-            arrival_delays = []
-            cancelled_departures = 0
-            cancelled_arrivals = 0
-            cancellation_reasons = {"departure": [], "arrival": []}
-            processed_count = 0
-
-            # Fetch service details with real-time progress streaming
-            semaphore = asyncio.Semaphore(3)
+            yield sse_event({'type': 'progress', 'step': 'processing_journeys', 'message': f'Processing {total_rids} journeys...', 'total': total_rids, 'current': 0})
+
+            # Per-RID results slotted by RID position as each fetch completes: one
+            # (rid, [departure, arrival]) int32 buffer where DELAY_MISSING marks a slot with no
+            # recorded time, plus cancellation reasons kept in RID order
+            delay_buffer = np.full((total_rids, 2), DELAY_MISSING, dtype=np.int32)
+            processed = np.zeros(total_rids, dtype=bool)
+            departure_cancel_reasons: List[Optional[str]] = [None] * total_rids
+            arrival_cancel_reasons: List[Optional[str]] = [None] * total_rids
+
+            # Completions arrive off the fetch workers' queue; each is recorded straight away and
+            # progress goes out every 5% as the work actually finishes
+            progress_interval = max(1, total_rids // 20)
             completed_count = 0
-            service_results = []
-
-            async def fetch_with_semaphore(rid: str, index: int):
-                nonlocal completed_count
-                async with semaphore:
-                    if index > 0:
-                        await asyncio.sleep(0.2)  # Rate limiting
-
-                    service_data = await get_service_details_by_rid(rid, credentials)
-                    completed_count += 1
-                    return (index, rid, service_data)
-
-            # Process all RIDs concurrently with streaming progress
-            tasks = [fetch_with_semaphore(rid, i) for i, rid in enumerate(rids)]
-
-            # Use as_completed to get results as they finish and stream progress
-            for completed_task in asyncio.as_completed(tasks):
-                result = await completed_task
-                service_results.append(result)
-
-                # Stream progress update after each completion
-                progress = (completed_count / total_rids) * 100
-                yield f"data: {json.dumps({'type': 'progress', 'step': 'fetching_services', 'message': f'Fetched {completed_count}/{total_rids} services ({progress:.0f}%)', 'total': total_rids, 'current': completed_count, 'percentage': progress})}\n\n"
-
-            # Sort results by original index
-            service_results.sort(key=lambda x: x[0])
-            service_results = [(r[1], r[2]) for r in service_results]
-
-            # Process results
-            for idx, (rid, service_data) in enumerate(service_results, 1):
-                if service_data and "serviceAttributesDetails" in service_data:
-                    locations = service_data.get("serviceAttributesDetails", {}).get("locations", [])
-
-                    if locations:
-                        processed_count += 1
-
-                        # Get delays for the specific origin and destination stations
-                        dep_delay, arr_delay, dep_cancel_reason, arr_cancel_reason = get_station_delays(
-                            locations, request.from_loc, request.to_loc
-                        )
-
-                        # Handle departure delays
-                        if dep_delay is not None:
-                            departure_delays.append(dep_delay)
-                        elif dep_cancel_reason:
-                            cancelled_departures += 1
-                            cancellation_reasons["departure"].append(dep_cancel_reason)
-                        else:
-                            cancelled_departures += 1
-                            cancellation_reasons["departure"].append("No data available")
-
-                        # Handle arrival delays
-                        if arr_delay is not None:
-                            arrival_delays.append(arr_delay)
-                        elif arr_cancel_reason:
-                            cancelled_arrivals += 1
-                            cancellation_reasons["arrival"].append(arr_cancel_reason)
-                        else:
-                            cancelled_arrivals += 1
-                            cancellation_reasons["arrival"].append("No data available")
-
-                # Send progress updates every 5% or for last item
-                if idx % progress_interval == 0 or idx == total_rids:
-                    progress = (idx / total_rids) * 100
-                    yield f"data: {json.dumps({'type': 'progress', 'step': 'processing_journeys', 'message': f'Processed {idx}/{total_rids} journeys ({progress:.0f}%)', 'total': total_rids, 'current': idx, 'percentage': progress})}\n\n"
-                    await asyncio.sleep(0.1)
-
-            yield f"data: {json.dumps({'type': 'progress', 'step': 'generating_analysis', 'message': 'Generating analysis results...'})}\n\n"
-            await asyncio.sleep(0.1)
-
-            # Generate the analysis result (reuse the existing logic)
-            def create_enhanced_histogram(delays: List[int], cancelled_count: int = 0) -> Dict[str, Any]:
-                counts = {}
-                counts["3-5 min early"] = sum(1 for d in delays if -5 <= d <= -3)
-                counts["2-3 min early"] = sum(1 for d in delays if -3 < d <= -2)
-                counts["On time (±1 min)"] = sum(1 for d in delays if -1 <= d <= 1)
-                counts["2-3 min late"] = sum(1 for d in delays if 1 < d <= 3)
-                counts["3-5 min late"] = sum(1 for d in delays if 3 < d <= 5)
-                counts["5-10 min late"] = sum(1 for d in delays if 5 < d <= 10)
-                counts["10-15 min late"] = sum(1 for d in delays if 10 < d <= 15)
-                counts["15-30 min late"] = sum(1 for d in delays if 15 < d <= 30)
-                counts["30+ min late"] = sum(1 for d in delays if d > 30)
-                if cancelled_count > 0:
-                    counts["Cancelled"] = cancelled_count
-
-                total_count = len(delays) + cancelled_count
-                histogram = {}
-                for bucket, count in counts.items():
-                    percentage = round((count / total_count) * 100, 1) if total_count > 0 else 0.0
-                    histogram[bucket] = percentage
-
-                on_time_count = sum(1 for d in delays if -1 <= d <= 1)
-                early_count = sum(1 for d in delays if d < -1)
-                late_count = sum(1 for d in delays if d > 1)
-                extreme_delays = sum(1 for d in delays if d > 30)
-
-                stats = {
-                    "avg_delay": round(sum(delays) / len(delays), 1) if delays else 0,
-                    "early_count": early_count,
-                    "on_time_count": on_time_count,
-                    "late_count": late_count,
-                    "extreme_delays": extreme_delays,
-                    "cancelled_count": cancelled_count,
-                    "total_count": total_count,
-                    "on_time_percentage": round((on_time_count / total_count) * 100, 1) if total_count > 0 else 0.0,
-                    "early_percentage": round((early_count / total_count) * 100, 1) if total_count > 0 else 0.0,
-                    "late_percentage": round((late_count / total_count) * 100, 1) if total_count > 0 else 0.0,
-                    "cancelled_percentage": round((cancelled_count / total_count) * 100, 1) if total_count > 0 else 0.0
-                }
+            async for index, rid, delays in stream_station_delays(
+                rids, request.from_loc, request.to_loc, credentials, app.state.http
+            ):
+                completed_count += 1
+                if delays is not None:
+                    processed[index] = True
+                    dep_delay, arr_delay, dep_cancel_reason, arr_cancel_reason = delays
+
+                    # A missing delay means cancelled, with or without a reason from HSP
+                    if dep_delay is not None:
+                        delay_buffer[index, 0] = dep_delay
+                    else:
+                        departure_cancel_reasons[index] = dep_cancel_reason or "No data available"
 
-                return {"histogram": histogram, "stats": stats, "raw_counts": counts}
+                    if arr_delay is not None:
+                        delay_buffer[index, 1] = arr_delay
+                    else:
+                        arrival_cancel_reasons[index] = arr_cancel_reason or "No data available"
+
+                if completed_count % progress_interval == 0 or completed_count == total_rids:
+                    progress = (completed_count / total_rids) * 100
+                    yield sse_event({'type': 'progress', 'step': 'processing_journeys', 'message': f'Processed {completed_count}/{total_rids} journeys ({progress:.0f}%)', 'total': total_rids, 'current': completed_count, 'percentage': progress})
+
+            processed_count = int(np.count_nonzero(processed))
+            departure_column = delay_buffer[:, 0]
+            arrival_column = delay_buffer[:, 1]
+            departure_delays = departure_column[departure_column != DELAY_MISSING]
+            arrival_delays = arrival_column[arrival_column != DELAY_MISSING]
+            cancelled_departures = int(np.count_nonzero(processed & (departure_column == DELAY_MISSING)))
+            cancelled_arrivals = int(np.count_nonzero(processed & (arrival_column == DELAY_MISSING)))
+            cancellation_reasons = {
+                "departure": [reason for reason in departure_cancel_reasons if reason is not None],
+                "arrival": [reason for reason in arrival_cancel_reasons if reason is not None]
+            }
+
+            yield sse_event({'type': 'progress', 'step': 'generating_analysis', 'message': 'Generating analysis results...'})
 
             departure_analysis = create_enhanced_histogram(departure_delays, cancelled_departures)
             arrival_analysis = create_enhanced_histogram(arrival_delays, cancelled_arrivals)
@@ -966,13 +1315,13 @@ async def analyze_journey_stream(request: ServiceMetricsRequest):
                     "histogram": departure_analysis["histogram"],
                     "avg_delay": departure_analysis["stats"]["avg_delay"],
                     "on_time_count": departure_analysis["stats"]["on_time_count"],
-                    "extreme_delays": sum(1 for d in departure_delays if d > 30)
+                    "extreme_delays": departure_analysis["stats"]["extreme_delays"]
                 },
                 "arrival_delays": {
                     "histogram": arrival_analysis["histogram"],
                     "avg_delay": arrival_analysis["stats"]["avg_delay"],
                     "on_time_count": arrival_analysis["stats"]["on_time_count"],
-                    "extreme_delays": sum(1 for d in arrival_delays if d > 30)
+                    "extreme_delays": arrival_analysis["stats"]["extreme_delays"]
                 },
                 "departure_performance": {
                     **departure_analysis,
@@ -988,207 +1337,307 @@ async def analyze_journey_stream(request: ServiceMetricsRequest):
                 }
             }
 
-            yield f"data: {json.dumps({'type': 'complete', 'data': result})}\n\n"
+            remember_journey_result(request, result)
+            yield sse_event({'type': 'complete', 'data': result})
 
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'message': f'Error generating journey analysis: {str(e)}'})}\n\n"
+            yield sse_event({'type': 'error', 'message': f'Error generating journey analysis: {str(e)}'})
 
-    return StreamingResponse(generate_progress(), media_type="text/plain")
+    # Tell reverse proxies not to buffer, so each event reaches the client as it is produced
+    return StreamingResponse(
+        generate_progress(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/v1/delays/histogram")
 async def get_delay_histogram():
     """Get histogram data for departure and arrival delays from Paddington->Havant route"""
     try:
-        # Read RIDs from file
-        rid_file_path = os.path.join(os.path.dirname(__file__), "pad_oxf_rids.txt")
-
-        if not os.path.exists(rid_file_path):
+        # RIDs were read from file at startup
+        rids = app.state.demo_rids
+        if rids is None:
             raise HTTPException(status_code=404, detail="RID file not found")
 
-        with open(rid_file_path, 'r') as f:
-            rids = [line.strip() for line in f.readlines() if line.strip()]
+        # The RID list is fixed for the process, so a complete result stays valid for a day
+        cached = app.state.demo_histogram
+        if cached is not None and time.monotonic() < cached[0]:
+            return cached[1]
 
         credentials = HSPCredentials(email=settings.RAIL_EMAIL, password=settings.RAIL_PWORD)
 
-        departure_delays = []
-        arrival_delays = []
-        all_departure_delays = []  # Include all delays for on-time calculation
-        all_arrival_delays = []    # Include all delays for on-time calculation
-        extreme_departure_delays = 0
-        extreme_arrival_delays = 0
-
-        # Fetch all service details concurrently (max 3 to avoid rate limiting)
-        service_results = await fetch_service_details_concurrently(
-            rids, credentials, max_concurrent=3
-        )
+        # HHMM pairs for the first (departure) and last (arrival) station of each service, slotted
+        # by RID position; a slot left empty is dropped by the vectorized delay conversion
+        rid_count = len(rids)
+        departure_scheduled, departure_actual = [""] * rid_count, [""] * rid_count
+        arrival_scheduled, arrival_actual = [""] * rid_count, [""] * rid_count
 
-        # Process results
-        for rid, service_data in service_results:
+        # Fetch all service details concurrently (bounded to avoid rate limiting), recording each
+        # as it arrives
+        fetched_count = 0
+        async for index, rid, service_data in stream_service_details(rids, credentials, app.state.http):
             if service_data and "serviceAttributesDetails" in service_data:
-                locations = service_data.get("serviceAttributesDetails", {}).get("locations", [])
+                fetched_count += 1
+                locations = service_data["serviceAttributesDetails"].get("locations", [])
 
                 if locations:
-                    # First station (departure)
                     first_station = locations[0]
-                    dep_delay = calculate_delay_minutes(
-                        first_station.get("gbtt_ptd", ""),
-                        first_station.get("actual_td", "")
-                    )
-                    if dep_delay is not None:
-                        all_departure_delays.append(dep_delay)  # Always include for on-time calc
-                        if dep_delay > 30:
-                            extreme_departure_delays += 1
-                        else:
-                            departure_delays.append(dep_delay)  # Only for average calc
+                    departure_scheduled[index] = first_station.get("gbtt_ptd", "")
+                    departure_actual[index] = first_station.get("actual_td", "")
 
-                    # Last station (arrival)
                     last_station = locations[-1]
-                    arr_delay = calculate_delay_minutes(
-                        last_station.get("gbtt_pta", ""),
-                        last_station.get("actual_ta", "")
-                    )
-                    if arr_delay is not None:
-                        all_arrival_delays.append(arr_delay)  # Always include for on-time calc
-                        if arr_delay > 30:
-                            extreme_arrival_delays += 1
-                        else:
-                            arrival_delays.append(arr_delay)  # Only for average calc
-
-        # Create histogram bins (0 to +30 minutes) - no negative since nothing arrives/departs early
-        bins = list(range(0, 31, 3))  # 3-minute bins for better visibility: 0-3, 3-6, 6-9, etc.
-
-        def create_histogram(delays: List[int], bins: List[int]) -> Dict[str, int]:
-            histogram = {}
-            for i in range(len(bins) - 1):
-                bin_label = f"{bins[i]} to {bins[i+1]}"
-                count = sum(1 for delay in delays if bins[i] <= delay < bins[i+1])
-                histogram[bin_label] = count
-
-            # Handle outliers
-            early_outliers = sum(1 for delay in delays if delay < 0)
-            late_outliers = sum(1 for delay in delays if delay >= bins[-1])
-
-            # Add early arrivals/departures to the "0-3 min" bucket (they're on time or early)
-            if "0 to 3" in histogram:
-                histogram["0 to 3"] += early_outliers
-            elif early_outliers > 0:
-                histogram["0 to 3"] = early_outliers
-
-            if late_outliers > 0:
-                histogram[f"{bins[-1]}+ min"] = late_outliers
-
-            return histogram
-
-        return {
+                    arrival_scheduled[index] = last_station.get("gbtt_pta", "")
+                    arrival_actual[index] = last_station.get("actual_ta", "")
+
+        # Convert every pair in one pass; cancelled services (no actual time) drop out here
+        all_departure = delay_minutes_array(departure_scheduled, departure_actual)
+        all_arrival = delay_minutes_array(arrival_scheduled, arrival_actual)
+
+        # Delays over 30 min are counted as extreme and kept out of the histogram and average
+        departure_delays = all_departure[all_departure <= 30]
+        arrival_delays = all_arrival[all_arrival <= 30]
+        extreme_departure_delays = int(np.count_nonzero(all_departure > 30))
+        extreme_arrival_delays = int(np.count_nonzero(all_arrival > 30))
+
+        result = {
             "route": "Paddington → Havant",
             "total_services": len(rids),
-            "analyzed_services": len(all_departure_delays),
+            "analyzed_services": len(all_departure),
             "departure_delays": {
-                "histogram": create_histogram(departure_delays, bins),
-                "avg_delay": sum(departure_delays) / len(departure_delays) if departure_delays else 0,
-                "on_time_count": sum(1 for d in all_departure_delays if d <= 0),  # Use ALL delays for on-time
+                "histogram": count_minute_bins(departure_delays),
+                "avg_delay": float(departure_delays.mean()) if departure_delays.size else 0,
+                # On-time counts use ALL delays (including >30 min)
+                "on_time_count": int(np.count_nonzero(all_departure <= 0)),
                 "extreme_delays": extreme_departure_delays
             },
             "arrival_delays": {
-                "histogram": create_histogram(arrival_delays, bins),
-                "avg_delay": sum(arrival_delays) / len(arrival_delays) if arrival_delays else 0,
-                "on_time_count": sum(1 for d in all_arrival_delays if d <= 0),  # Use ALL delays for on-time
+                "histogram": count_minute_bins(arrival_delays),
+                "avg_delay": float(arrival_delays.mean()) if arrival_delays.size else 0,
+                "on_time_count": int(np.count_nonzero(all_arrival <= 0)),
                 "extreme_delays": extreme_arrival_delays
             }
         }
 
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="RID file not found")
+        # Only a result covering every RID is kept; a partial one (HSP errors, open circuit)
+        # is recomputed next time
+        if fetched_count == rid_count:
+            app.state.demo_histogram = (time.monotonic() + HISTOGRAM_RESULT_TTL, result)
+        return result
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating histogram: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating histogram: {str(e)}")
 
+# Prompt for the AI analysis endpoint, filled in per request with str.format
+AI_ANALYSIS_PROMPT = """\
+You are a railway performance analyst. Analyze the following delay data for the {route} railway route and provide insights:
+
+Route: {route}
+Date Range: {date_range}
+Time Window: {time_range}
+Days: {days}
+Total Services Analyzed: {analyzed_services}
+
+Departure Performance:
+- Average Delay: {dep_avg_delay:.1f} minutes
+- On-time Rate: {dep_on_time:.1f}%
+- Early Rate: {dep_early:.1f}%
+- Late Rate: {dep_late:.1f}%
+- Cancelled Rate: {dep_cancelled:.1f}%
+- Reliability: {dep_reliability:.1f}%
+
+Arrival Performance:
+- Average Delay: {arr_avg_delay:.1f} minutes
+- On-time Rate: {arr_on_time:.1f}%
+- Early Rate: {arr_early:.1f}%
+- Late Rate: {arr_late:.1f}%
+- Cancelled Rate: {arr_cancelled:.1f}%
+- Reliability: {arr_reliability:.1f}%
+
+Please provide:
+1. Overall performance assessment (excellent/good/average/poor)
+2. Key delay patterns and reliability insights
+3. Probability of delays for future journeys (as a percentage)
+4. Expected delay range for a typical journey
+5. Recommendations for travelers
+6. Best travel tips based on this route's performance
+
+Keep your response concise but informative, suitable for a passenger planning their journey.
+"""
+
+# Model answers keyed by a fingerprint of the prompt: the prompt carries every number the model
+# sees, so unchanged delay data is answered without another OpenAI call
+AI_ANALYSIS_TTL = 60 * 60
+AI_ANALYSIS_MAX_ENTRIES = 256
+_ai_analyses: Dict[str, tuple[float, str]] = {}
+
+def ai_analysis_fingerprint(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+def recent_ai_analysis(prompt: str) -> Optional[str]:
+    """A model answer for this prompt from the last AI_ANALYSIS_TTL seconds, if any"""
+    fingerprint = ai_analysis_fingerprint(prompt)
+    entry = _ai_analyses.get(fingerprint)
+    if entry is None:
+        return None
+    expires_at, analysis = entry
+    if time.monotonic() >= expires_at:
+        del _ai_analyses[fingerprint]
+        return None
+    return analysis
+
+def remember_ai_analysis(prompt: str, analysis: str) -> None:
+    fingerprint = ai_analysis_fingerprint(prompt)
+    _ai_analyses.pop(fingerprint, None)
+    _ai_analyses[fingerprint] = (time.monotonic() + AI_ANALYSIS_TTL, analysis)
+    while len(_ai_analyses) > AI_ANALYSIS_MAX_ENTRIES:
+        del _ai_analyses[next(iter(_ai_analyses))]
+
+AI_ANALYSIS_DISABLED_MESSAGE = "AI analysis is disabled in production environment. The journey analysis data above provides detailed performance metrics for your route."
+AI_ANALYSIS_SYSTEM_MESSAGE = "You are an expert railway analyst providing travel advice based on historical performance data."
+
+def build_ai_analysis_prompt(journey_data: Dict[str, Any]) -> str:
+    """Fill AI_ANALYSIS_PROMPT from a journey analysis result"""
+    # Extract key metrics for AI analysis
+    dep_performance = journey_data.get('departure_performance', {})
+    arr_performance = journey_data.get('arrival_performance', {})
+
+    dep_stats = dep_performance.get('stats', {})
+    arr_stats = arr_performance.get('stats', {})
+
+    return AI_ANALYSIS_PROMPT.format(
+        route=journey_data['route'],
+        date_range=journey_data['date_range'],
+        time_range=journey_data['time_range'],
+        days=journey_data['days'],
+        analyzed_services=journey_data['analyzed_services'],
+        dep_avg_delay=dep_stats.get('avg_delay', 0),
+        dep_on_time=dep_stats.get('on_time_percentage', 0),
+        dep_early=dep_stats.get('early_percentage', 0),
+        dep_late=dep_stats.get('late_percentage', 0),
+        dep_cancelled=dep_stats.get('cancelled_percentage', 0),
+        dep_reliability=dep_performance.get('reliability', 0),
+        arr_avg_delay=arr_stats.get('avg_delay', 0),
+        arr_on_time=arr_stats.get('on_time_percentage', 0),
+        arr_early=arr_stats.get('early_percentage', 0),
+        arr_late=arr_stats.get('late_percentage', 0),
+        arr_cancelled=arr_stats.get('cancelled_percentage', 0),
+        arr_reliability=arr_performance.get('reliability', 0)
+    )
+
+def ai_analysis_messages(analysis_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": AI_ANALYSIS_SYSTEM_MESSAGE},
+        {"role": "user", "content": analysis_prompt}
+    ]
+
+def prepare_ai_analysis(journey_data: Dict[str, Any]) -> tuple[Optional[str], str]:
+    """
+    (ready answer, prompt) for a journey analysis. The ready answer is the production notice or
+    a recent model answer to the same prompt; when it is None the prompt still needs OpenAI.
+    """
+    if IS_PRODUCTION:
+        return AI_ANALYSIS_DISABLED_MESSAGE, ""
+    analysis_prompt = build_ai_analysis_prompt(journey_data)
+    return recent_ai_analysis(analysis_prompt), analysis_prompt
+
+def ai_analysis_result(journey_data: Dict[str, Any], ai_analysis: Optional[str], cached: bool) -> Dict[str, Any]:
+    """The AI analysis payload; cached means the answer came without an OpenAI call"""
+    return {
+        "journey_data": journey_data,
+        "ai_analysis": ai_analysis,
+        "cached": cached,
+        "generated_at": datetime.now().isoformat()
+    }
+
 @app.post("/api/v1/ai-analysis")
 async def get_ai_analysis(request: ServiceMetricsRequest):
     """Get AI analysis of delay patterns and predictions for any route"""
     try:
         logger.info(f"AI Analysis request received: {request}")
 
-        # Get journey analysis data for the requested route
-        journey_data = await analyze_journey(request)
+        # Get journey analysis data for the requested route, reusing the analysis the journey
+        # endpoints just produced for it when there is one
+        journey_data = await analyze_journey_cached(request)
 
-        # Check if AI analysis is disabled in production
-        if IS_PRODUCTION:
-            return {
-                "journey_data": journey_data,
-                "ai_analysis": "AI analysis is disabled in production environment. The journey analysis data above provides detailed performance metrics for your route.",
-                "generated_at": datetime.now().isoformat()
-            }
+        # The production notice or a recent answer to the same prompt skips OpenAI
+        ai_analysis, analysis_prompt = prepare_ai_analysis(journey_data)
+        cached = ai_analysis is not None
 
-        # Initialize OpenAI client
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        # Extract key metrics for AI analysis
-        dep_performance = journey_data.get('departure_performance', {})
-        arr_performance = journey_data.get('arrival_performance', {})
-
-        dep_stats = dep_performance.get('stats', {})
-        arr_stats = arr_performance.get('stats', {})
-
-        # Prepare data for AI analysis
-        analysis_prompt = f"""
-        You are a railway performance analyst. Analyze the following delay data for the {journey_data['route']} railway route and provide insights:
-
-        Route: {journey_data['route']}
-        Date Range: {journey_data['date_range']}
-        Time Window: {journey_data['time_range']}
-        Days: {journey_data['days']}
-        Total Services Analyzed: {journey_data['analyzed_services']}
-
-        Departure Performance:
-        - Average Delay: {dep_stats.get('avg_delay', 0):.1f} minutes
-        - On-time Rate: {dep_stats.get('on_time_percentage', 0):.1f}%
-        - Early Rate: {dep_stats.get('early_percentage', 0):.1f}%
-        - Late Rate: {dep_stats.get('late_percentage', 0):.1f}%
-        - Cancelled Rate: {dep_stats.get('cancelled_percentage', 0):.1f}%
-        - Reliability: {dep_performance.get('reliability', 0):.1f}%
-
-        Arrival Performance:
-        - Average Delay: {arr_stats.get('avg_delay', 0):.1f} minutes
-        - On-time Rate: {arr_stats.get('on_time_percentage', 0):.1f}%
-        - Early Rate: {arr_stats.get('early_percentage', 0):.1f}%
-        - Late Rate: {arr_stats.get('late_percentage', 0):.1f}%
-        - Cancelled Rate: {arr_stats.get('cancelled_percentage', 0):.1f}%
-        - Reliability: {arr_performance.get('reliability', 0):.1f}%
-
-        Please provide:
-        1. Overall performance assessment (excellent/good/average/poor)
-        2. Key delay patterns and reliability insights
-        3. Probability of delays for future journeys (as a percentage)
-        4. Expected delay range for a typical journey
-        5. Recommendations for travelers
-        6. Best travel tips based on this route's performance
-
-        Keep your response concise but informative, suitable for a passenger planning their journey.
-        """
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert railway analyst providing travel advice based on historical performance data."},
-                {"role": "user", "content": analysis_prompt}
-            ],
-            max_tokens=600,
-            temperature=0.7
-        )
-
-        ai_analysis = response.choices[0].message.content
-
-        return {
-            "journey_data": journey_data,
-            "ai_analysis": ai_analysis,
-            "generated_at": datetime.now().isoformat()
-        }
+        if not cached:
+            # The async client awaits OpenAI without holding up the event loop
+            response = await app.state.openai.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=ai_analysis_messages(analysis_prompt),
+                max_tokens=600,
+                temperature=0.7
+            )
+
+            ai_analysis = response.choices[0].message.content
+            if ai_analysis:
+                remember_ai_analysis(analysis_prompt, ai_analysis)
+
+        return ai_analysis_result(journey_data, ai_analysis, cached)
 
     except Exception as e:
         logger.error(f"Error generating AI analysis: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating AI analysis: {str(e)}")
 
+@app.post("/api/v1/ai-analysis-stream")
+async def get_ai_analysis_stream(request: ServiceMetricsRequest):
+    """Get AI analysis as server-sent events, forwarding the model's answer as it is generated"""
+
+    async def generate_analysis():
+        try:
+            yield sse_event({'type': 'progress', 'step': 'analyzing_journey', 'message': 'Analyzing journey performance...'})
+
+            journey_data = await analyze_journey_cached(request)
+            # The journey results can be shown while the model is still answering
+            yield sse_event({'type': 'journey', 'data': journey_data})
+
+            ai_analysis, analysis_prompt = prepare_ai_analysis(journey_data)
+            cached = ai_analysis is not None
+
+            if cached:
+                yield sse_event({'type': 'token', 'content': ai_analysis})
+            else:
+                yield sse_event({'type': 'progress', 'step': 'generating_ai_analysis', 'message': 'Generating AI analysis...'})
+
+                # Each delta goes out as soon as OpenAI sends it, so the reader sees the first
+                # words instead of waiting for the whole answer
+                stream = await app.state.openai.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=ai_analysis_messages(analysis_prompt),
+                    max_tokens=600,
+                    temperature=0.7,
+                    stream=True
+                )
+                parts = []
+                async for chunk in stream:
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if content:
+                        parts.append(content)
+                        yield sse_event({'type': 'token', 'content': content})
+
+                ai_analysis = "".join(parts)
+                if ai_analysis:
+                    remember_ai_analysis(analysis_prompt, ai_analysis)
+
+            yield sse_event({'type': 'complete', 'data': ai_analysis_result(journey_data, ai_analysis, cached)})
+
+        except Exception as e:
+            logger.error(f"Error generating AI analysis: {e}")
+            yield sse_event({'type': 'error', 'message': f'Error generating AI analysis: {str(e)}'})
+
+    # Tell reverse proxies not to buffer, so each event reaches the client as it is produced
+    return StreamingResponse(
+        generate_analysis(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Cache accessor endpoints
 @app.get("/api/v1/cache/stats")
 async def get_cache_stats():
@@ -1220,13 +1669,16 @@ async def get_cached_service_by_filename(filename: str):
     service_data = cache_manager.get_service_by_filename(filename)
     if not service_data:
         raise HTTPException(status_code=404, detail=f"Service file not found: {filename}")
-    return service_data
+    # Forward the stored JSON as-is rather than parsing and re-serializing it
+    return Response(content=service_data.to_json(), media_type="application/json")
 
 @app.get("/api/v1/cache/search")
 async def search_cached_services(from_loc: str, to_loc: str):
     """Search cached services by route"""
     results = cache_manager.search_services_by_route(from_loc, to_loc)
-    return {"route": f"{from_loc} → {to_loc}", "results": results, "count": len(results)}
+    envelope = orjson.dumps({"route": f"{from_loc} → {to_loc}", "count": len(results)}).decode()
+    results_json = ", ".join(service.to_json() for service in results)
+    return Response(content=f'{envelope[:-1]}, "results": [{results_json}]}}', media_type="application/json")
 
 if __name__ == "__main__":
     print("\n" + "="*60)
@@ -1,9 +1,9 @@
 """Test autocomplete functionality"""
-import json
+import orjson
 
-# Load station codes
-with open('all_station_codes.json', 'r', encoding='utf-8') as f:
-    ALL_STATION_CODES = json.load(f)
+# Load station codes (orjson parses the raw bytes directly, as the server does)
+with open('all_station_codes.json', 'rb') as f:
+    ALL_STATION_CODES = orjson.loads(f.read())
 
 def autocomplete_stations(query, limit=10):
     """Simulate the autocomplete endpoint logic"""
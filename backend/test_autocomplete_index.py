@@ -0,0 +1,74 @@
+"""Test the indexed autocomplete search against the original linear scan"""
+import asyncio
+import os
+import random
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# main reads its settings at import; the HSP and OpenAI clients are never used here
+for name in ("RAIL_EMAIL", "RAIL_PWORD", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import main
+from main import ALL_STATION_CODES
+
+LIMITS = (1, 5, 10, 50, 0, -3)
+
+def linear_autocomplete(query, limit=10):
+    """The autocomplete endpoint before it was indexed: scan and sort every station"""
+    if not query or len(query) < 1:
+        return []
+
+    query_upper = query.upper()
+    matches = []
+
+    is_code_query = len(query) == 3 and query.isalpha()
+
+    for code, name in ALL_STATION_CODES.items():
+        if code.startswith(query_upper):
+            match_type = "code"
+        elif name.upper().startswith(query_upper):
+            match_type = "name"
+        elif not is_code_query and query_upper in name.upper():
+            match_type = "partial"
+        else:
+            continue
+        matches.append({"code": code, "name": name, "match_type": match_type, "display": f"{name} ({code})"})
+
+    def sort_key(match):
+        if match["match_type"] == "code":
+            return (0, match["code"] == query_upper, match["name"])
+        elif match["match_type"] == "name":
+            return (1, match["name"])
+        else:
+            return (2, match["name"])
+
+    matches.sort(key=sort_key, reverse=True)
+    return matches[:limit]
+
+def indexed_autocomplete(query, limit):
+    request = Request({"type": "http", "method": "GET", "path": "/api/v1/stations/autocomplete", "headers": []})
+    return asyncio.run(main.autocomplete_stations(request, Response(), query, limit))
+
+def sample_queries():
+    rng = random.Random(7)
+    codes = list(ALL_STATION_CODES)
+    names = list(ALL_STATION_CODES.values())
+    queries = ["", "a", "LON", "lon", "st ", "-", "'", "&", "\n", "zzz", "Q", "XYZQ"]
+    queries += rng.sample(codes, 150)
+    queries += [code[:rng.randint(1, 2)] for code in rng.sample(codes, 100)]
+    for name in rng.sample(names, 250):
+        start = rng.randrange(len(name))
+        fragment = name[start:start + rng.randint(1, 8)]
+        queries.append(fragment.lower() if rng.random() < 0.5 else fragment)
+    return queries
+
+def test_indexed_autocomplete_matches_linear_scan():
+    for query in sample_queries():
+        for limit in LIMITS:
+            assert indexed_autocomplete(query, limit) == linear_autocomplete(query, limit), (query, limit)
+
+if __name__ == "__main__":
+    test_indexed_autocomplete_matches_linear_scan()
+    print("autocomplete index tests passed")
@@ -0,0 +1,115 @@
+"""Test the vectorized delay calculations against their scalar versions"""
+import os
+import random
+
+# main reads its settings at import; the HSP and OpenAI clients are never used here
+for name in ("RAIL_EMAIL", "RAIL_PWORD", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import numpy as np
+
+from main import calculate_delay_minutes, delay_minutes_array, count_minute_bins, create_enhanced_histogram
+
+def random_hhmm(rng):
+    """A valid HHMM time most of the time, otherwise something the parser must reject"""
+    roll = rng.random()
+    if roll < 0.1:
+        return ""
+    if roll < 0.15:
+        return rng.choice(["700", "07000", "07:0", "7:00", "ab12", "12 4", "0700a", "٠٧٠٠"])
+    hhmm = f"{rng.randrange(24):02d}{rng.randrange(60):02d}"
+    return rng.choice(["", " ", "\t"]) + hhmm + rng.choice(["", "", " "]) if roll < 0.3 else hhmm
+
+def expected_delays(scheduled_times, actual_times):
+    """The scalar calculation applied pair by pair, keeping only pairs it accepts"""
+    delays = []
+    for scheduled, actual in zip(scheduled_times, actual_times):
+        scheduled, actual = scheduled.strip(), actual.strip()
+        if len(scheduled) == 4 and len(actual) == 4 and (scheduled + actual).isascii() and (scheduled + actual).isdigit():
+            delays.append(calculate_delay_minutes(scheduled, actual))
+    return delays
+
+def test_delay_minutes_array_matches_scalar():
+    rng = random.Random(1)
+    for _ in range(200):
+        count = rng.randrange(1, 60)
+        scheduled_times = [random_hhmm(rng) for _ in range(count)]
+        actual_times = [random_hhmm(rng) for _ in range(count)]
+        assert delay_minutes_array(scheduled_times, actual_times).tolist() == expected_delays(scheduled_times, actual_times)
+
+def test_delay_minutes_array_strips_padding():
+    assert delay_minutes_array([" 0700", "0815 ", "\t2358\n"], ["0703 ", " 0810", "0004"]).tolist() == [3, -5, 6]
+
+def test_delay_minutes_array_rejects_non_hhmm():
+    # Not four digits once stripped: dropped rather than misread
+    assert delay_minutes_array(["700", "07000", "07:00", "0 700", ""], ["0703"] * 5).tolist() == []
+    assert delay_minutes_array([], []).tolist() == []
+
+def bucket_counts_by_scan(delays, cancelled_count):
+    """The journey histogram's raw counts as they were computed before the lookup table"""
+    counts = {
+        "3-5 min early": sum(1 for d in delays if -5 <= d <= -3),
+        "2-3 min early": sum(1 for d in delays if -3 < d <= -2),
+        "On time (±1 min)": sum(1 for d in delays if -1 <= d <= 1),
+        "2-3 min late": sum(1 for d in delays if 1 < d <= 3),
+        "3-5 min late": sum(1 for d in delays if 3 < d <= 5),
+        "5-10 min late": sum(1 for d in delays if 5 < d <= 10),
+        "10-15 min late": sum(1 for d in delays if 10 < d <= 15),
+        "15-30 min late": sum(1 for d in delays if 15 < d <= 30),
+        "30+ min late": sum(1 for d in delays if d > 30),
+    }
+    if cancelled_count > 0:
+        counts["Cancelled"] = cancelled_count
+    return counts
+
+def minute_bins_by_scan(delays):
+    """The fixed-route histogram as it was computed before integer-division binning"""
+    bins = list(range(0, 31, 3))
+    histogram = {}
+    for i in range(len(bins) - 1):
+        histogram[f"{bins[i]} to {bins[i+1]}"] = sum(1 for delay in delays if bins[i] <= delay < bins[i+1])
+    histogram["0 to 3"] += sum(1 for delay in delays if delay < 0)
+    late_outliers = sum(1 for delay in delays if delay >= bins[-1])
+    if late_outliers > 0:
+        histogram[f"{bins[-1]}+ min"] = late_outliers
+    return histogram
+
+def random_delays(rng):
+    count = rng.choice([0, 1, rng.randrange(2, 400)])
+    return [rng.choice([rng.randint(-8, 40), rng.randint(-720, 720)]) for _ in range(count)]
+
+def test_enhanced_histogram_matches_scan():
+    rng = random.Random(2)
+    for _ in range(500):
+        delays = random_delays(rng)
+        cancelled_count = rng.choice([0, 0, rng.randrange(1, 20)])
+        result = create_enhanced_histogram(np.array(delays, dtype=np.int32), cancelled_count)
+        counts = bucket_counts_by_scan(delays, cancelled_count)
+        total_count = len(delays) + cancelled_count
+        assert result["raw_counts"] == counts
+
+        stats = result["stats"]
+        assert stats["on_time_count"] == sum(1 for d in delays if -1 <= d <= 1)
+        assert stats["early_count"] == sum(1 for d in delays if d < -1)
+        assert stats["late_count"] == sum(1 for d in delays if d > 1)
+        assert stats["extreme_delays"] == sum(1 for d in delays if d > 30)
+        assert stats["total_count"] == total_count
+        assert stats["avg_delay"] == (round(sum(delays) / len(delays), 1) if delays else 0)
+        for bucket, count in counts.items():
+            expected = round(count / total_count * 100, 1) if total_count > 0 else 0.0
+            # Vectorized rounding may land the other way on an exact .x5 tie
+            assert abs(result["histogram"][bucket] - expected) <= 0.1 + 1e-9
+
+def test_minute_bins_match_scan():
+    rng = random.Random(3)
+    for _ in range(500):
+        delays = random_delays(rng)
+        assert count_minute_bins(np.array(delays, dtype=np.int32)) == minute_bins_by_scan(delays)
+
+if __name__ == "__main__":
+    test_delay_minutes_array_matches_scalar()
+    test_delay_minutes_array_strips_padding()
+    test_delay_minutes_array_rejects_non_hhmm()
+    test_enhanced_histogram_matches_scan()
+    test_minute_bins_match_scan()
+    print("delay math tests passed")
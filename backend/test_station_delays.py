@@ -0,0 +1,106 @@
+"""Test the per-route station delay cache"""
+import asyncio
+import os
+import random
+import tempfile
+
+# main reads its settings at import; the HSP and OpenAI clients are never used here
+for name in ("RAIL_EMAIL", "RAIL_PWORD", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+import main
+from cache_manager import CacheManager
+from main import calculate_delay_minutes, make_station_delay_extractor
+
+# A service that ran long enough ago for its delays to be cached
+HISTORICAL_RID = "202001017100001"
+
+SERVICE_DETAILS = {
+    "serviceAttributesDetails": {
+        "locations": [
+            {"location": "PAD", "gbtt_ptd": "0700", "actual_td": "0703"},
+            {"location": "RDG", "gbtt_ptd": "0725", "gbtt_pta": "0724", "actual_td": "0729", "actual_ta": "0727"},
+            {"location": "OXF", "gbtt_pta": "0800", "actual_ta": "0806"},
+        ]
+    }
+}
+
+async def fake_stream_service_details(rids, credentials, client):
+    for position, rid in enumerate(rids):
+        yield position, rid, SERVICE_DETAILS
+
+async def no_service_details(rids, credentials, client):
+    assert not rids, f"expected every RID from the cache, fetched {rids}"
+    return
+    yield
+
+def collect_station_delays(from_loc, to_loc):
+    async def collect():
+        return [item async for item in main.stream_station_delays([HISTORICAL_RID], from_loc, to_loc, None, None)]
+    return asyncio.run(collect())
+
+def test_lowercase_route_does_not_poison_cache():
+    original_cache, original_stream = main.cache_manager, main.stream_service_details
+    with tempfile.TemporaryDirectory() as cache_dir:
+        main.cache_manager = CacheManager(base_path=cache_dir)
+        main.stream_service_details = fake_stream_service_details
+        try:
+            expected = [(0, HISTORICAL_RID, (3, 6, None, None))]
+            assert collect_station_delays("pad", "oxf") == expected
+
+            # Served from the cache now, and still the real delays
+            main.stream_service_details = no_service_details
+            assert collect_station_delays("PAD", "OXF") == expected
+        finally:
+            main.cache_manager._conn.close()
+            main.cache_manager, main.stream_service_details = original_cache, original_stream
+
+def station_delays_by_scan(locations, origin_station, destination_station):
+    """Station delay extraction as it was before calls were indexed by station"""
+    departure_delay = arrival_delay = departure_cancel_reason = arrival_cancel_reason = None
+    for location in locations:
+        station_code = location.get("location", "")
+        cancel_reason = location.get("late_canc_reason", "")
+        if station_code == origin_station and location.get("gbtt_ptd", ""):
+            if location.get("actual_td", ""):
+                departure_delay = calculate_delay_minutes(location["gbtt_ptd"], location["actual_td"])
+            else:
+                departure_cancel_reason = cancel_reason or "Service cancelled"
+        if station_code == destination_station and location.get("gbtt_pta", ""):
+            if location.get("actual_ta", ""):
+                arrival_delay = calculate_delay_minutes(location["gbtt_pta"], location["actual_ta"])
+            else:
+                arrival_cancel_reason = cancel_reason or "Service cancelled"
+    return departure_delay, arrival_delay, departure_cancel_reason, arrival_cancel_reason
+
+def random_location(rng, station_code):
+    location = {"location": station_code}
+    for key in ("gbtt_ptd", "gbtt_pta", "actual_td", "actual_ta"):
+        if rng.random() < 0.7:
+            location[key] = rng.choice(["", f"{rng.randrange(24):02d}{rng.randrange(60):02d}"])
+    if rng.random() < 0.3:
+        location["late_canc_reason"] = rng.choice(["", "XX"])
+    return location
+
+def test_extractor_matches_scan_without_repeated_stations():
+    rng = random.Random(4)
+    extract = make_station_delay_extractor("PAD", "OXF")
+    for _ in range(5000):
+        stations = rng.sample(["PAD", "RDG", "DID", "OXF", "SWI", "BRI"], rng.randrange(7))
+        locations = [random_location(rng, station) for station in stations]
+        assert extract(locations) == station_delays_by_scan(locations, "PAD", "OXF")
+
+def test_extractor_uses_last_scheduled_call_on_loops():
+    # A looping service calls at PAD twice; the later call decides, not a mix of both
+    locations = [
+        {"location": "PAD", "gbtt_ptd": "0700", "late_canc_reason": "TG"},
+        {"location": "OXF", "gbtt_pta": "0800", "actual_ta": "0805"},
+        {"location": "PAD", "gbtt_ptd": "0900", "actual_td": "0902"},
+    ]
+    assert make_station_delay_extractor("PAD", "OXF")(locations) == (2, 5, None, None)
+
+if __name__ == "__main__":
+    test_lowercase_route_does_not_poison_cache()
+    test_extractor_matches_scan_without_repeated_stations()
+    test_extractor_uses_last_scheduled_call_on_loops()
+    print("station delay cache tests passed")
@@ -340,7 +340,7 @@ function App() {
         days: days
       };
 
-      const response = await fetch(`${API_URL}/api/v1/ai-analysis`, {
+      const response = await fetch(`${API_URL}/api/v1/ai-analysis-stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -352,17 +352,63 @@ function App() {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
-      setHistogramData(data.journey_data);
-      setAiAnalysis(data.ai_analysis);
+      // The answer is filled in as the model writes it, so start from an empty analysis
+      setAiAnalysis(null);
 
-      // Scroll to results after data is loaded
-      setTimeout(() => {
-        const resultsSection = document.querySelector('.results-section');
-        if (resultsSection) {
-          resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streamError = null;
+
+      while (true) {
+        const { done, value } = await reader.read();
+
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+
+        // Keep the last incomplete line in buffer
+        buffer = lines.pop() || '';
+
+        for (const line of lines) {
+          if (line.startsWith('data: ')) {
+            let data;
+            try {
+              data = JSON.parse(line.substring(6));
+            } catch (parseError) {
+              console.warn('Failed to parse streaming data:', parseError);
+              continue;
+            }
+
+            if (data.type === 'progress') {
+              setLoadingProgress(data.message);
+            } else if (data.type === 'journey') {
+              setHistogramData(data.data);
+
+              // Scroll to results as soon as the journey data is in; the analysis streams in above
+              setTimeout(() => {
+                const resultsSection = document.querySelector('.results-section');
+                if (resultsSection) {
+                  resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+                }
+              }, 100);
+            } else if (data.type === 'token') {
+              setLoadingProgress(null);
+              setAiAnalysis(previous => (previous || '') + data.content);
+            } else if (data.type === 'complete') {
+              setHistogramData(data.data.journey_data);
+              setAiAnalysis(data.data.ai_analysis);
+            } else if (data.type === 'error') {
+              streamError = data.message;
+            }
+          }
         }
-      }, 100);
+      }
+
+      if (streamError) {
+        throw new Error(streamError);
+      }
     } catch (err) {
       setError(`Failed to fetch AI analysis: ${err.message}`);
     } finally {